@@ -0,0 +1,76 @@
+"""
+Shared fixtures for the recommendation pipeline benchmarks
+"""
+from itertools import product
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+import pytest
+
+# The recommendation engines only need Django importable, not configured
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ROLES = ['athlete', 'patient', 'elderly', 'doctor', 'pharmacist', 'public']
+
+HEALTH_CONDITIONS = [
+    'asthma',
+    'heart,hypertension',
+    'diabetes,arthritis',
+    'asthma,copd,heart,hypertension,diabetes,arthritis,migraine',
+]
+
+TEMPERATURES = [-2, 8, 18, 26, 32, 38, 43]
+HUMIDITIES = [25, 55, 75, 90]
+UV_INDICES = [2, 7, 11]
+AIR_QUALITY = [1, 3, 5]
+CONDITIONS = [
+    ('clear', 'Clear sky', 'none', 'low'),
+    ('rain', 'Light rain', 'heavy', 'low'),
+    ('dust', 'Dust', 'none', 'high'),
+]
+
+
+def _weather_snapshot(temp, humidity, uv_index, aqi, condition):
+    weather_condition, description, monsoon_intensity, dust_storm_risk = condition
+    return {
+        'city': 'Delhi',
+        'temperature': temp,
+        'feels_like': temp + 2,
+        'humidity': humidity,
+        'pressure': 1000 if weather_condition == 'rain' else 1013,
+        'description': description,
+        'weather_condition': weather_condition,
+        'wind_speed': 30 if dust_storm_risk == 'high' else 8,
+        'uv_index': uv_index,
+        'air_quality_index': aqi,
+        'pollen_count': 4 if weather_condition == 'clear' else 2,
+        'heat_index': temp + (0.5 * (humidity - 40)) if temp >= 27 and humidity >= 40 else temp,
+        'monsoon_intensity': monsoon_intensity,
+        'dust_storm_risk': dust_storm_risk,
+        'comfort_level': 'very_hot' if temp > 35 else 'hot_humid' if temp > 30 and humidity > 70 else 'moderate',
+    }
+
+
+@pytest.fixture(scope='session')
+def weather_grid():
+    """Every combination of the benchmark weather inputs (756 snapshots)"""
+    return [
+        _weather_snapshot(*values)
+        for values in product(TEMPERATURES, HUMIDITIES, UV_INDICES, AIR_QUALITY, CONDITIONS)
+    ]
+
+
+class _DeviceSet(list):
+    """Stands in for a SmartDevice queryset"""
+
+    def exists(self):
+        return bool(self)
+
+
+@pytest.fixture(scope='session')
+def user_devices():
+    return _DeviceSet(
+        SimpleNamespace(device_type=device_type)
+        for device_type in ['ac', 'curtains', 'window', 'lights', 'smart_plug']
+    )
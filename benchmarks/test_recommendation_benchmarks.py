@@ -0,0 +1,78 @@
+"""
+Benchmarks for the recommendation pipeline across roles and a grid of weather inputs
+
+Run with ``pytest benchmarks``; results are saved under ``.benchmarks/`` so a
+later run can be compared with ``--benchmark-compare``.
+"""
+import pytest
+
+from weather.enhanced_recommendations import EnhancedRecommendationEngine
+from weather.health_recommendations import HealthRecommendationEngine
+from weather.indian_climate_recommendations import IndianClimateRecommendations
+from weather.patient_alert_system import PatientAlertSystem
+
+from conftest import HEALTH_CONDITIONS, ROLES
+
+
+@pytest.mark.parametrize('role', ROLES)
+def test_health_recommendations(benchmark, weather_grid, role):
+    def run():
+        for weather in weather_grid:
+            HealthRecommendationEngine.get_recommendations(weather, role, 'asthma,arthritis,diabetes')
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize('cached', [False, True], ids=['cold', 'warm'])
+@pytest.mark.parametrize('role', ROLES)
+def test_comprehensive_recommendations(benchmark, weather_grid, user_devices, role, cached):
+    cache = EnhancedRecommendationEngine.get_recommendation_cache()
+
+    def run():
+        # Cold rounds recompute every weather point; warm rounds hit the memo cache
+        if not cached:
+            cache.clear()
+        for weather in weather_grid:
+            EnhancedRecommendationEngine.get_comprehensive_recommendations(
+                weather, role, 'asthma,heart,diabetes', user_devices
+            )
+
+    cache.clear()
+    if cached:
+        run()
+    benchmark(run)
+
+
+@pytest.mark.parametrize('health_conditions', HEALTH_CONDITIONS)
+def test_patient_alerts(benchmark, weather_grid, health_conditions):
+    def run():
+        for weather in weather_grid:
+            PatientAlertSystem.get_all_patient_alerts(weather, None, health_conditions)
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize('users', [1000, 100000])
+def test_batch_recommendations(benchmark, weather_grid, users):
+    device_sets = [(), ('ac',), ('ac', 'curtains', 'window')]
+    user_roles = [ROLES[i % len(ROLES)] for i in range(users)]
+    health_conditions = [HEALTH_CONDITIONS[i % len(HEALTH_CONDITIONS)] for i in range(users)]
+    device_types = [device_sets[i % len(device_sets)] for i in range(users)]
+    weather = weather_grid[len(weather_grid) // 2]
+
+    benchmark(
+        EnhancedRecommendationEngine.get_batch_recommendations,
+        weather, user_roles, health_conditions, device_types
+    )
+
+
+@pytest.mark.parametrize('role', ROLES)
+def test_timeline_trigger_masks(benchmark, weather_grid, role):
+    np = pytest.importorskip('numpy')
+    week = weather_grid[:168]
+    timeline = {
+        field: np.array([weather[field] for weather in week])
+        for field in ['temperature', 'humidity', 'air_quality_index', 'uv_index', 'monsoon_intensity', 'dust_storm_risk']
+    }
+
+    benchmark(IndianClimateRecommendations.get_trigger_masks, timeline, role)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class WeatherConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'weather'
+
+    def ready(self):
+        from django.conf import settings
+
+        if getattr(settings, 'WEATHER_PREFETCH_IN_PROCESS', False):
+            from .prefetch import get_prefetch_scheduler
+            get_prefetch_scheduler().start()
+
+        if getattr(settings, 'WEATHER_ENSURE_INDEXES_ON_STARTUP', False):
+            from .indexes import ensure_indexes_in_background
+            ensure_indexes_in_background()
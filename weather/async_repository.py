@@ -0,0 +1,140 @@
+"""
+Async repository for stored weather readings
+"""
+import asyncio
+from datetime import datetime
+import threading
+
+from pymongo import ASCENDING, DESCENDING, InsertOne
+
+from weather_health_app.async_mongodb import get_async_collection, is_async_collection
+from . import timeseries
+
+
+class AsyncWeatherRepository:
+    """Async save / latest / range / bulk operations on the weather readings collection.
+
+    By default the collection comes from the Motor client of the running
+    event loop and follows WEATHER_STORAGE_MODE. A collection can also be
+    injected: Motor collections are awaited directly, and synchronous
+    pymongo or mongomock collections are run with ``asyncio.to_thread`` so
+    the repository can be exercised without a server.
+    """
+
+    def __init__(self, collection=None):
+        self._injected = collection
+
+    def _collection(self):
+        if self._injected is not None:
+            return self._injected
+        return get_async_collection(timeseries.readings_collection_name())
+
+    async def _writable_collection(self):
+        """The collection to insert into, with the time-series collection set up before the first write"""
+        collection = self._collection()
+        if collection is None or self._injected is not None:
+            return collection
+        if not await asyncio.to_thread(timeseries.ensure_readings_collection):
+            return None
+        return collection
+
+    async def _call(self, collection, method, *args, **kwargs):
+        if is_async_collection(collection):
+            return await getattr(collection, method)(*args, **kwargs)
+        return await asyncio.to_thread(getattr(collection, method), *args, **kwargs)
+
+    async def _find(self, collection, query, projection=None, sort=None, limit=0):
+        if is_async_collection(collection):
+            cursor = collection.find(query, projection, sort=sort, limit=limit)
+            return await cursor.to_list(length=None)
+        return await asyncio.to_thread(
+            lambda: list(collection.find(query, projection, sort=sort, limit=limit))
+        )
+
+    async def _aggregate(self, collection, pipeline):
+        if is_async_collection(collection):
+            return await collection.aggregate(pipeline).to_list(length=None)
+        return await asyncio.to_thread(lambda: list(collection.aggregate(pipeline)))
+
+    async def save(self, weather_data):
+        """Store one reading (copied, stamped with saved_at); return its id or None if MongoDB is unavailable"""
+        collection = await self._writable_collection()
+        if collection is None:
+            return None
+        document = timeseries.to_storage_document(dict(weather_data, saved_at=datetime.now()))
+        result = await self._call(collection, 'insert_one', document)
+        return result.inserted_id
+
+    async def latest_for_city(self, city, date=None, fields=None):
+        """Latest reading for a city (and date), optionally limited to ``fields``"""
+        collection = self._collection()
+        if collection is None:
+            return None
+        query = {timeseries.city_field(): city}
+        if date:
+            query['date'] = date
+        document = await self._call(
+            collection, 'find_one', query, timeseries.projection(fields), sort=[('saved_at', DESCENDING)]
+        )
+        return timeseries.from_storage_document(document)
+
+    async def range_query(self, city, start, end, fields=None, limit=0):
+        """Readings for a city saved in ``[start, end)``, oldest first"""
+        collection = self._collection()
+        if collection is None:
+            return []
+        query = {timeseries.city_field(): city, 'saved_at': {'$gte': start, '$lt': end}}
+        documents = await self._find(
+            collection, query, timeseries.projection(fields), sort=[('saved_at', ASCENDING)], limit=limit
+        )
+        return [timeseries.from_storage_document(document) for document in documents]
+
+    async def latest_per_day(self, city, start, end, fields=None):
+        """Last reading saved on each day in ``[start, end)`` keyed by 'YYYY-MM-DD', or None if MongoDB is unavailable"""
+        collection = self._collection()
+        if collection is None:
+            return None
+        pipeline = timeseries.latest_per_day_pipeline(city, start, end, fields)
+        return timeseries.readings_by_day(await self._aggregate(collection, pipeline))
+
+    async def bulk_write(self, operations, ordered=False):
+        """Run a batch of write operations in one round-trip
+
+        Plain dicts are treated as readings to insert (copied, and stamped
+        with saved_at unless they carry one); pymongo operation objects such as
+        ``UpdateOne`` are passed through. Returns the write counts, or
+        ``None`` if MongoDB is unavailable.
+        """
+        collection = await self._writable_collection()
+        if collection is None:
+            return None
+        now = datetime.now()
+        requests = [
+            InsertOne(timeseries.to_storage_document(dict({'saved_at': now}, **operation)))
+            if isinstance(operation, dict) else operation
+            for operation in operations
+        ]
+        if not requests:
+            return {'inserted': 0, 'matched': 0, 'modified': 0, 'deleted': 0, 'upserted': 0}
+        result = await self._call(collection, 'bulk_write', requests, ordered=ordered)
+        return {
+            'inserted': result.inserted_count,
+            'matched': result.matched_count,
+            'modified': result.modified_count,
+            'deleted': result.deleted_count,
+            'upserted': result.upserted_count,
+        }
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_async_weather_repository():
+    """Get the shared async weather repository (its collection is resolved per event loop)"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = AsyncWeatherRepository()
+    return _repository
@@ -0,0 +1,240 @@
+"""
+In-process TTL cache with LRU eviction and stale-while-revalidate support
+"""
+from collections import OrderedDict
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live.
+
+    Entries younger than ``ttl`` seconds are served as fresh hits. Entries
+    older than ``ttl`` but younger than ``ttl + stale_ttl`` are still served,
+    and a background refresh is started for them (stale-while-revalidate).
+    Anything older is treated as a miss.
+    """
+
+    def __init__(self, ttl=300, stale_ttl=600, max_entries=1000, clock=time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'evictions': 0,
+        }
+
+    def get(self, key, refresh=None):
+        """Return the cached value for ``key`` or ``None`` on a miss.
+
+        ``refresh`` is an optional zero-argument callable. When a stale entry
+        is served it is called in a background thread and its result, if not
+        ``None``, replaces the entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, stored_at = entry
+            age = self._clock() - stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return value
+
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self._stats['stale_hits'] += 1
+                start_refresh = refresh is not None and key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+            else:
+                self._stats['misses'] += 1
+                return None
+
+        if start_refresh:
+            threading.Thread(
+                target=self._refresh, args=(key, refresh), daemon=True
+            ).start()
+        return value
+
+    def peek(self, key):
+        """Return ``(value, age_seconds)`` for ``key`` regardless of expiry, or ``None``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            return value, self._clock() - stored_at
+
+    def set(self, key, value, age=0):
+        """Store ``value`` under ``key``, evicting the least recently used entries
+
+        ``age`` backdates the entry, for values that were produced elsewhere
+        some seconds ago and should expire accordingly.
+        """
+        with self._lock:
+            self._entries[key] = (value, self._clock() - age)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def expires_in(self, key):
+        """Seconds until ``key`` stops being fresh, or ``None`` if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return self.ttl - (self._clock() - entry[1])
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_matching(self, predicate):
+        """Drop every entry whose key satisfies ``predicate``; return how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a snapshot of the hit/miss/refresh counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['refreshing'] = len(self._refreshing)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _refresh(self, key, refresh):
+        try:
+            value = refresh()
+            if value is not None:
+                self.set(key, value)
+                with self._lock:
+                    self._stats['refreshes'] += 1
+            else:
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key!r}: {e}")
+            with self._lock:
+                self._stats['refresh_failures'] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class _Call:
+    """An in-flight call whose result is shared with every waiter"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block until it finishes and receive the same result (or
+    exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['calls'] += 1
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+class AsyncSingleFlight:
+    """Event-loop counterpart of :class:`SingleFlight` for coroutines.
+
+    Waiters await a shielded task, so a cancelled caller does not cancel the
+    fetch the other waiters depend on.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()  # loop -> {key: task}
+        self._stats = {'calls': 0, 'shared': 0}
+
+    async def do(self, key, coro_fn):
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is None:
+            task = loop.create_task(coro_fn())
+            calls[key] = task
+            task.add_done_callback(lambda _: calls.pop(key, None))
+            self._stats['calls'] += 1
+        else:
+            self._stats['shared'] += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['in_flight'] = sum(len(calls) for calls in self._calls.values())
+        return stats
@@ -0,0 +1,160 @@
+"""
+Circuit breaker for calls to the upstream weather provider
+"""
+from collections import deque
+from datetime import datetime
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    every call is rejected immediately for ``recovery_timeout`` seconds. It
+    then goes half-open and lets up to ``half_open_max_calls`` trial calls
+    through: a success closes the circuit again, a failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1,
+                 history_size=50, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._half_open_calls = 0
+        self._transitions = deque(maxlen=history_size)
+        self._listeners = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            state = self._state
+        self._notify()
+        return state
+
+    def allow_request(self):
+        """Return True if a call may go through, reserving a half-open slot if needed"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                allowed = True
+            elif self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                allowed = True
+            else:
+                self._stats['rejected'] += 1
+                allowed = False
+        self._notify()
+        return allowed
+
+    def release(self):
+        """Give back a reserved call that never reached the upstream"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self._stats['successes'] += 1
+            self._failures = 0
+            if self._state == self.HALF_OPEN:
+                self._half_open_calls = 0
+                self._transition(self.CLOSED)
+        self._notify()
+
+    def record_failure(self):
+        with self._lock:
+            self._stats['failures'] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._half_open_calls = 0
+                self._opened_at = self._clock()
+                self._stats['opened'] += 1
+                self._transition(self.OPEN)
+        self._notify()
+
+    def add_listener(self, listener):
+        """Call ``listener(name, old_state, new_state)`` on every state change"""
+        self._listeners.append(listener)
+
+    def stats(self):
+        """Current state, counters and recent transitions for monitoring"""
+        with self._lock:
+            self._maybe_half_open()
+            stats = dict(self._stats)
+            stats.update({
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'retry_in': round(max(0, self._opened_at + self.recovery_timeout - self._clock()), 1)
+                if self._state == self.OPEN else 0,
+                'transitions': list(self._transitions),
+            })
+        self._notify()
+        return stats
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._transition(self.HALF_OPEN)
+
+    def _transition(self, new_state):
+        old_state = self._state
+        if old_state == new_state:
+            return
+        self._state = new_state
+        self._transitions.append({
+            'from': old_state,
+            'to': new_state,
+            'at': datetime.now().isoformat(),
+        })
+        self._pending.append((old_state, new_state))
+
+    def _notify(self):
+        """Log and report transitions outside the lock so listeners may call back in"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for old_state, new_state in pending:
+            logger.warning(f"Circuit {self.name} {old_state} -> {new_state}")
+            for listener in self._listeners:
+                try:
+                    listener(self.name, old_state, new_state)
+                except Exception as e:
+                    logger.error(f"Circuit breaker listener failed: {e}")
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_weather_circuit_breaker():
+    """Get the circuit breaker guarding the weather API"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                from django.conf import settings
+                _breaker = CircuitBreaker(
+                    'weather_api',
+                    failure_threshold=getattr(settings, 'WEATHER_API_CIRCUIT_FAILURE_THRESHOLD', 5),
+                    recovery_timeout=getattr(settings, 'WEATHER_API_CIRCUIT_RECOVERY_TIMEOUT', 30),
+                    half_open_max_calls=getattr(settings, 'WEATHER_API_CIRCUIT_HALF_OPEN_MAX_CALLS', 1),
+                )
+    return _breaker
@@ -0,0 +1,191 @@
+"""
+Demo weather generation without touching the process-wide random state
+"""
+from datetime import datetime, timedelta
+import random
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WEATHER_CONDITIONS = [
+    {'desc': 'Clear sky', 'icon': '01d'},
+    {'desc': 'Few clouds', 'icon': '02d'},
+    {'desc': 'Scattered clouds', 'icon': '03d'},
+    {'desc': 'Broken clouds', 'icon': '04d'},
+    {'desc': 'Light rain', 'icon': '10d'},
+    {'desc': 'Overcast', 'icon': '04d'}
+]
+
+
+def seed_for(city, date):
+    """Stable seed for one city and day (crc32, so it does not vary with PYTHONHASHSEED)"""
+    return zlib.crc32(f"{city}|{date.strftime('%Y-%m-%d')}".encode('utf-8'))
+
+
+def current_weather(city="London", seed=None):
+    """Demo current weather; pass ``seed`` for a reproducible reading"""
+    rng = random.Random(seed)
+    condition = rng.choice(WEATHER_CONDITIONS)
+    temp = rng.randint(15, 30)
+
+    return {
+        'city': city,
+        'country': 'Demo',
+        'temperature': temp,
+        'feels_like': temp + rng.randint(-3, 3),
+        'humidity': rng.randint(40, 80),
+        'pressure': rng.randint(1000, 1025),
+        'description': condition['desc'],
+        'icon': condition['icon'],
+        'wind_speed': rng.randint(2, 15),
+        'wind_direction': rng.randint(0, 360),
+        'visibility': rng.randint(5, 15),
+        'uv_index': rng.randint(1, 11),
+        'air_quality_index': rng.randint(1, 5),
+        'pollen_count': rng.randint(1, 5),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def historical_day(city, date):
+    """Demo weather for one city and day; the same inputs always give the same reading"""
+    rng = random.Random(seed_for(city, date))
+    condition = rng.choice(WEATHER_CONDITIONS)
+    temp = rng.randint(12, 28)
+
+    return {
+        'date': date.strftime('%Y-%m-%d'),
+        'city': city,
+        'temperature': temp,
+        'feels_like': temp + rng.randint(-3, 3),
+        'humidity': rng.randint(35, 85),
+        'pressure': rng.randint(995, 1030),
+        'description': condition['desc'],
+        'icon': condition['icon'],
+        'wind_speed': rng.randint(1, 18),
+        'wind_direction': rng.randint(0, 360),
+        'visibility': rng.randint(3, 20),
+        'uv_index': rng.randint(1, 10),
+        'air_quality_index': rng.randint(1, 5),
+        'pollen_count': rng.randint(1, 5),
+        'timestamp': date.isoformat()
+    }
+
+
+def historical_days(city, days_back=7, now=None):
+    """Demo readings for the ``days_back`` days before ``now``, newest first"""
+    now = now or datetime.now()
+    return [historical_day(city, now - timedelta(days=i + 1)) for i in range(days_back)]
+
+
+def historical_bulk(cities, days_back=7, now=None):
+    """Demo readings for many cities at once, keyed by city
+
+    Every reading has its own generator, so this can also be split across
+    threads or processes and still give identical results.
+    """
+    now = now or datetime.now()
+    return {city: historical_days(city, days_back, now) for city in cities}
+
+
+# (column, low, high) inclusive ranges, matching historical_day
+_COLUMN_RANGES = [
+    ('temperature', 12, 28),
+    ('humidity', 35, 85),
+    ('pressure', 995, 1030),
+    ('wind_speed', 1, 18),
+    ('wind_direction', 0, 360),
+    ('visibility', 3, 20),
+    ('uv_index', 1, 10),
+    ('air_quality_index', 1, 5),
+    ('pollen_count', 1, 5),
+]
+
+
+class WeatherColumns:
+    """Demo weather for N cities x D days held as flat NumPy columns.
+
+    Row ``i`` is city ``i // D`` on day ``i % D`` (days newest first, as in
+    ``historical_days``). Record and document exports convert each column
+    to Python values once with ``tolist()`` and stream rows from those, so
+    no per-value NumPy scalars are created and rows are never all held at
+    once.
+    """
+
+    def __init__(self, cities, dates, columns):
+        self.cities = list(cities)
+        self.dates = list(dates)
+        self.columns = columns  # name -> ndarray of length len(cities) * len(dates)
+
+    def __len__(self):
+        return len(self.cities) * len(self.dates)
+
+    def records(self):
+        """Yield dicts shaped like ``historical_day`` readings"""
+        names = [name for name, _, _ in _COLUMN_RANGES] + ['feels_like']
+        values = [self.columns[name].tolist() for name in names]
+        conditions = self.columns['condition'].tolist()
+        days = [(date.strftime('%Y-%m-%d'), date.isoformat()) for date in self.dates]
+        day_count = len(self.dates)
+
+        for row, row_values in enumerate(zip(*values)):
+            record = dict(zip(names, row_values))
+            day, timestamp = days[row % day_count]
+            condition = WEATHER_CONDITIONS[conditions[row]]
+            record.update({
+                'date': day,
+                'city': self.cities[row // day_count],
+                'description': condition['desc'],
+                'icon': condition['icon'],
+                'timestamp': timestamp,
+            })
+            yield record
+
+    def mongo_documents(self):
+        """Yield documents ready for insert_many in the configured storage mode, saved at their day"""
+        from .timeseries import to_storage_document
+
+        day_count = len(self.dates)
+        for row, record in enumerate(self.records()):
+            record['saved_at'] = self.dates[row % day_count]
+            yield to_storage_document(record)
+
+    def insert_into(self, collection, batch_size=10000):
+        """Bulk insert every row with unordered insert_many; return how many were inserted"""
+        inserted = 0
+        batch = []
+        for document in self.mongo_documents():
+            batch.append(document)
+            if len(batch) >= batch_size:
+                inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+                batch = []
+        if batch:
+            inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+        return inserted
+
+
+def generate_columns(cities, days_back=7, now=None, seed=0):
+    """Generate demo weather for every city and each of the ``days_back`` days before ``now`` in one vectorized pass
+
+    Values follow the same ranges as ``historical_day`` and are reproducible
+    for the same arguments, but come from one NumPy generator for the whole
+    grid, so individual rows do not match ``historical_day``.
+    """
+    if np is None:
+        raise ImproperlyConfigured("numpy is required for columnar demo weather generation")
+
+    now = now or datetime.now()
+    dates = [now - timedelta(days=i + 1) for i in range(days_back)]
+    rows = len(cities) * days_back
+    rng = np.random.default_rng(seed)
+
+    columns = {name: rng.integers(low, high, size=rows, endpoint=True, dtype=np.int16)
+               for name, low, high in _COLUMN_RANGES}
+    columns['feels_like'] = columns['temperature'] + rng.integers(-3, 3, size=rows, endpoint=True, dtype=np.int16)
+    columns['condition'] = rng.integers(0, len(WEATHER_CONDITIONS), size=rows, dtype=np.int8)
+    return WeatherColumns(cities, dates, columns)
@@ -2,10 +2,64 @@
 Enhanced weather-based recommendations including energy and smart home features with Indian climate support
 """
 from datetime import datetime
+import heapq
+from itertools import chain
 import random
+import threading
+from .cache import TTLCache
 from .indian_climate_recommendations import IndianClimateRecommendations
 from .patient_alert_system import PatientAlertSystem
 
+_recommendation_cache = None
+_recommendation_cache_lock = threading.Lock()
+
+# Weather fields read by the comprehensive recommendations (the climate,
+# patient alert, energy and smart home engines). They are keyed by exact value
+# because most of them are interpolated into message text.
+_COMPREHENSIVE_FIELDS = (
+    'temperature', 'heat_index', 'humidity', 'uv_index', 'air_quality_index', 'wind_speed', 'pressure',
+    'monsoon_intensity', 'dust_storm_risk', 'weather_condition', 'comfort_level',
+)
+
+PRIORITY_ORDER = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+
+def _merge_by_priority(recommendations, limit=None):
+    """Drop repeated titles (first occurrence wins) and order by priority, then arrival
+
+    ``recommendations`` is consumed as a stream: duplicates are skipped as
+    they arrive, and with ``limit`` only the best ``limit`` entries so far
+    are held, in a bounded heap keyed on (priority, arrival order).
+    """
+    if limit is not None and limit <= 0:
+        return []
+
+    seen_titles = set()
+    ranked = []
+    for sequence, rec in enumerate(recommendations):
+        title = rec.get('title')
+        if title in seen_titles:
+            continue
+        seen_titles.add(title)
+        rank = PRIORITY_ORDER.get(rec.get('priority', 'low'), 3)
+        if limit is None:
+            ranked.append((rank, sequence, rec))
+        elif len(ranked) < limit:
+            # Max-heap on (rank, sequence) so the worst kept entry is at the top
+            heapq.heappush(ranked, (-rank, -sequence, rec))
+        elif (-rank, -sequence) > ranked[0][:2]:
+            heapq.heapreplace(ranked, (-rank, -sequence, rec))
+
+    # Sequences are unique, so the tuples never compare the dicts themselves
+    ranked.sort(reverse=limit is not None)
+    return [rec for _, _, rec in ranked]
+
+
+def _copy_recommendation(recommendation):
+    """Copy of a recommendation dict and its list values, so the cached original stays intact"""
+    return {key: list(value) if isinstance(value, list) else value for key, value in recommendation.items()}
+
+
 class EnhancedRecommendationEngine:
     """Enhanced recommendation engine with energy and smart home features"""
     
@@ -154,8 +208,14 @@ class EnhancedRecommendationEngine:
         return recommendations
     
     @staticmethod
-    def get_energy_recommendations(weather_data):
-        """Energy saving recommendations based on weather"""
+    def get_energy_recommendations(weather_data, hour=None):
+        """Energy saving recommendations based on weather and the current hour"""
+        return (EnhancedRecommendationEngine.get_weather_energy_recommendations(weather_data)
+                + EnhancedRecommendationEngine.get_peak_energy_recommendations(hour))
+
+    @staticmethod
+    def get_weather_energy_recommendations(weather_data):
+        """Energy saving recommendations that depend only on the weather"""
         recommendations = []
         temp = weather_data.get('temperature', 20)
         humidity = weather_data.get('humidity', 50)
@@ -213,8 +273,13 @@ class EnhancedRecommendationEngine:
                 'actions': ['natural_ventilation', 'secure_items', 'check_leaks']
             })
         
-        # Peak hour recommendations
-        current_hour = datetime.now().hour
+        return recommendations
+    
+    @staticmethod
+    def get_peak_energy_recommendations(hour=None):
+        """Peak electricity hour recommendations for ``hour`` (default: now)"""
+        recommendations = []
+        current_hour = datetime.now().hour if hour is None else hour
         if 14 <= current_hour <= 18:  # Peak hours
             recommendations.append({
                 'type': 'warning',
@@ -230,8 +295,15 @@ class EnhancedRecommendationEngine:
         return recommendations
     
     @staticmethod
-    def get_smart_home_recommendations(weather_data, user_devices):
+    def get_smart_home_recommendations(weather_data, user_devices, hour=None):
         """Smart home automation recommendations"""
+        device_types = [device.device_type for device in user_devices] if user_devices else []
+        return (EnhancedRecommendationEngine.get_smart_home_weather_recommendations(weather_data, device_types)
+                + EnhancedRecommendationEngine.get_smart_home_peak_recommendations(weather_data, hour))
+
+    @staticmethod
+    def get_smart_home_weather_recommendations(weather_data, device_types):
+        """Smart home automations for the weather and the user's device types"""
         recommendations = []
         temp = weather_data.get('temperature', 20)
         humidity = weather_data.get('humidity', 50)
@@ -239,8 +311,6 @@ class EnhancedRecommendationEngine:
         wind_speed = weather_data.get('wind_speed', 5)
         description = weather_data.get('description', '').lower()
         
-        device_types = [device.device_type for device in user_devices] if user_devices else []
-        
         # Temperature-based automation
         if temp >= 28 and 'ac' in device_types:
             recommendations.append({
@@ -305,8 +375,16 @@ class EnhancedRecommendationEngine:
                 'actions': ['secure_furniture', 'close_shutters', 'monitor_power']
             })
         
+        return recommendations
+    
+    @staticmethod
+    def get_smart_home_peak_recommendations(weather_data, hour=None):
+        """Peak electricity hour automations for ``hour`` (default: now)"""
+        recommendations = []
+        temp = weather_data.get('temperature', 20)
+        
         # Energy optimization automation
-        current_hour = datetime.now().hour
+        current_hour = datetime.now().hour if hour is None else hour
         if 14 <= current_hour <= 18 and temp >= 26:  # Peak hours + hot weather
             recommendations.append({
                 'type': 'success',
@@ -323,8 +401,107 @@ class EnhancedRecommendationEngine:
         return recommendations
 
     @staticmethod
-    def get_comprehensive_recommendations(weather_data, user_role, health_conditions, user_devices=None, user=None):
-        """Get comprehensive recommendations including Indian climate and patient alerts"""
+    def get_comprehensive_recommendations(weather_data, user_role, health_conditions, user_devices=None, user=None,
+                                          limit=None):
+        """Get comprehensive recommendations including Indian climate and patient alerts
+
+        Everything except the peak-hour tips is a function of the weather,
+        role, health conditions and device types only, so it is memoized
+        and shared by every user with the same inputs; the peak-hour tips
+        are added per call. The recommendation dicts returned are copies.
+        Pass ``limit`` to get only the top ``limit`` recommendations.
+        """
+        device_types = frozenset(device.device_type for device in user_devices) if user_devices else frozenset()
+        return EnhancedRecommendationEngine._get_recommendations_for(
+            weather_data, user_role, health_conditions, device_types, user, limit=limit
+        )
+
+    @staticmethod
+    def get_batch_recommendations(weather_data, user_roles, health_conditions=None, device_types=None, hour=None,
+                                  limit=None):
+        """Comprehensive recommendations for many users sharing one weather snapshot
+
+        Users are given as columns: ``user_roles[i]``, ``health_conditions[i]``
+        (the profile string, as for one user) and ``device_types[i]`` (an
+        iterable of device type names) describe user ``i``; the last two may
+        be omitted. Users with the same role, relevant conditions and device
+        types are evaluated once, and groups whose recommendations come out
+        the same are merged. Returns ``{'recommendations': [...], 'users':
+        [i, ...]}`` groups in order of their first user, each with its own
+        copies of the recommendation dicts. ``limit`` keeps only the top
+        ``limit`` recommendations per group.
+        """
+        count = len(user_roles)
+        if health_conditions is None:
+            health_conditions = [None] * count
+        if device_types is None:
+            device_types = [()] * count
+        if len(health_conditions) != count or len(device_types) != count:
+            raise ValueError("user_roles, health_conditions and device_types must have the same length")
+
+        # Only patients' conditions are read, and only through lowercase substring tests
+        profiles = {}
+        for index, (role, conditions, devices) in enumerate(zip(user_roles, health_conditions, device_types)):
+            key = (
+                role,
+                conditions.lower() if role == 'patient' and conditions else None,
+                devices if isinstance(devices, frozenset) else frozenset(devices),
+            )
+            users = profiles.get(key)
+            if users is None:
+                profiles[key] = [index]
+            else:
+                users.append(index)
+
+        hour = datetime.now().hour if hour is None else hour
+        groups = {}
+        for (role, conditions, devices), users in profiles.items():
+            recommendations = EnhancedRecommendationEngine._get_recommendations_for(
+                weather_data, role, conditions, devices, hour=hour, limit=limit
+            )
+            # Equal outcomes from different profiles are separate dicts, so compare them by value
+            outcome = tuple(repr(recommendation) for recommendation in recommendations)
+            group = groups.get(outcome)
+            if group is None:
+                groups[outcome] = {'recommendations': recommendations, 'users': users}
+            else:
+                group['users'].extend(users)
+
+        result = list(groups.values())
+        for group in result:
+            group['users'].sort()
+        result.sort(key=lambda group: group['users'][0])
+        return result
+
+    @staticmethod
+    def _get_recommendations_for(weather_data, user_role, health_conditions, device_types, user=None, hour=None,
+                                 limit=None):
+        """Comprehensive recommendations for one profile at ``hour`` (default: now)"""
+        key = EnhancedRecommendationEngine._comprehensive_key(weather_data, user_role, health_conditions, device_types)
+        cache = EnhancedRecommendationEngine.get_recommendation_cache()
+        cached = cache.get(key)
+        if cached is None:
+            cached = EnhancedRecommendationEngine._get_weather_recommendations(
+                weather_data, user_role, health_conditions, device_types, user
+            )
+            cache.set(key, cached)
+        weather_recommendations, smart_home_recommendations = cached
+
+        hour = datetime.now().hour if hour is None else hour
+        sources = [
+            weather_recommendations,
+            EnhancedRecommendationEngine.get_peak_energy_recommendations(hour),
+        ]
+        if device_types:
+            sources.append(smart_home_recommendations)
+            sources.append(EnhancedRecommendationEngine.get_smart_home_peak_recommendations(weather_data, hour))
+
+        # Remove duplicates and order by priority in one pass over every source
+        return [_copy_recommendation(rec) for rec in _merge_by_priority(chain.from_iterable(sources), limit)]
+
+    @staticmethod
+    def _get_weather_recommendations(weather_data, user_role, health_conditions, device_types, user=None):
+        """Hour-independent recommendations as (general, smart home) tuples, in output order"""
         all_recommendations = []
 
         # Get Indian climate specific recommendations
@@ -351,26 +528,53 @@ class EnhancedRecommendationEngine:
 
         # Get energy recommendations
         all_recommendations.extend(
-            EnhancedRecommendationEngine.get_energy_recommendations(weather_data)
+            EnhancedRecommendationEngine.get_weather_energy_recommendations(weather_data)
         )
 
         # Get smart home recommendations if devices available
-        if user_devices and user_devices.exists():
-            all_recommendations.extend(
-                EnhancedRecommendationEngine.get_smart_home_recommendations(weather_data, user_devices)
+        smart_home_recommendations = []
+        if device_types:
+            smart_home_recommendations = EnhancedRecommendationEngine.get_smart_home_weather_recommendations(
+                weather_data, device_types
             )
 
-        # Remove duplicates and sort by priority
-        unique_recommendations = []
-        seen_titles = set()
+        return tuple(all_recommendations), tuple(smart_home_recommendations)
+
+    @staticmethod
+    def _comprehensive_key(weather_data, user_role, health_conditions, device_types):
+        """Memoization key: every input _get_weather_recommendations reads
 
-        for rec in all_recommendations:
-            if rec.get('title') not in seen_titles:
-                unique_recommendations.append(rec)
-                seen_titles.add(rec.get('title'))
+        Patient alerts accept ``user`` but do not read it, and the air
+        quality recommendations read ``city`` but do not use it, so neither
+        is part of the key. The free-text description only matters through
+        the smart home 'rain' test, so it is keyed by that flag.
+        """
+        conditions = health_conditions.lower() if user_role == 'patient' and health_conditions else None
+        return (
+            user_role,
+            conditions,
+            device_types,
+            tuple(weather_data.get(field) for field in _COMPREHENSIVE_FIELDS),
+            'rain' in weather_data.get('description', '').lower(),
+        )
 
-        # Sort by priority
-        priority_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
-        unique_recommendations.sort(key=lambda x: priority_order.get(x.get('priority', 'low'), 3))
+    @staticmethod
+    def get_recommendation_cache():
+        """Get the cache of hour-independent comprehensive recommendations"""
+        global _recommendation_cache
+        if _recommendation_cache is None:
+            with _recommendation_cache_lock:
+                if _recommendation_cache is None:
+                    from django.conf import settings
+                    ttl, max_entries = 600, 2000
+                    # The engines are also used without configured settings (benchmarks, scripts)
+                    if settings.configured:
+                        ttl = getattr(settings, 'WEATHER_RECOMMENDATION_CACHE_TTL', ttl)
+                        max_entries = getattr(settings, 'WEATHER_RECOMMENDATION_CACHE_MAX_ENTRIES', max_entries)
+                    _recommendation_cache = TTLCache(ttl=ttl, stale_ttl=0, max_entries=max_entries)
+        return _recommendation_cache
 
-        return unique_recommendations
+    @staticmethod
+    def get_cache_stats():
+        """Get hit/miss counters for the comprehensive recommendation cache"""
+        return EnhancedRecommendationEngine.get_recommendation_cache().stats()
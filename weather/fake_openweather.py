@@ -0,0 +1,180 @@
+"""
+Local stand-in for the OpenWeather ``/weather`` endpoint used for load and latency testing
+"""
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+CONDITIONS = [
+    (800, 'Clear', 'clear sky', '01d'),
+    (801, 'Clouds', 'few clouds', '02d'),
+    (802, 'Clouds', 'scattered clouds', '03d'),
+    (804, 'Clouds', 'overcast clouds', '04d'),
+    (500, 'Rain', 'light rain', '10d'),
+    (502, 'Rain', 'heavy intensity rain', '10d'),
+    (721, 'Haze', 'haze', '50d'),
+    (761, 'Dust', 'dust', '50d'),
+    (211, 'Thunderstorm', 'thunderstorm', '11d'),
+]
+
+
+class FakeOpenWeatherServer:
+    """Threaded HTTP server that answers like ``/data/2.5/weather``.
+
+    Payloads are deterministic per city (so cache behaviour is realistic)
+    and carry every field ``WeatherService._format_weather_data`` reads.
+    Latency, 5xx errors and 429 responses can be injected to exercise the
+    cache, circuit breaker and rate limiter under load.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=50, jitter_ms=20, error_rate=0.0,
+                 rate_limit_rate=0.0, rate_limit_per_second=0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rate_limit_per_second = rate_limit_per_second
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)  # (second, requests served in it)
+        self._stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'not_found': 0}
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        """Base URL to use as WEATHER_API_URL"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/data/2.5"
+
+    def start(self):
+        """Serve from a daemon thread and return self"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-openweather', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def payload(self, city=None, lat=None, lon=None):
+        """Build an OpenWeather-shaped current weather payload"""
+        name = city or f"{lat},{lon}"
+        rng = random.Random(zlib.crc32(name.strip().lower().encode('utf-8')))
+        # Drift slowly through the day so repeated fetches are not identical
+        hour = datetime.now().hour
+        condition_id, main, description, icon = rng.choice(CONDITIONS)
+        temp = rng.uniform(5, 40) + 3 * ((hour - 12) / 12.0)
+        humidity = rng.randint(20, 95)
+        now = int(time.time())
+
+        return {
+            'coord': {
+                'lon': float(lon) if lon is not None else round(rng.uniform(-180, 180), 4),
+                'lat': float(lat) if lat is not None else round(rng.uniform(-60, 70), 4),
+            },
+            'weather': [{'id': condition_id, 'main': main, 'description': description, 'icon': icon}],
+            'base': 'stations',
+            'main': {
+                'temp': round(temp, 2),
+                'feels_like': round(temp + rng.uniform(-3, 4), 2),
+                'temp_min': round(temp - rng.uniform(0, 3), 2),
+                'temp_max': round(temp + rng.uniform(0, 3), 2),
+                'pressure': rng.randint(995, 1030),
+                'humidity': humidity,
+            },
+            'visibility': rng.choice([1500, 4000, 8000, 10000]),
+            'wind': {'speed': round(rng.uniform(0.5, 12), 2), 'deg': rng.randint(0, 360)},
+            'clouds': {'all': rng.randint(0, 100)},
+            'dt': now,
+            'sys': {'country': rng.choice(['IN', 'GB', 'US', 'JP', 'AU']), 'sunrise': now - 21600, 'sunset': now + 21600},
+            'timezone': 19800,
+            'id': zlib.crc32(name.encode('utf-8')) % 10000000,
+            'name': city or 'Fake Location',
+            'cod': 200,
+        }
+
+    def _next_outcome(self):
+        """Pick latency and status for one request"""
+        with self._lock:
+            self._stats['requests'] += 1
+            latency = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000.0
+
+            if self.rate_limit_per_second:
+                second = int(time.time())
+                window_second, count = self._window
+                count = count + 1 if window_second == second else 1
+                self._window = (second, count)
+                if count > self.rate_limit_per_second:
+                    return latency, 429
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                return latency, 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                return latency, 500
+            return latency, 200
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                if not parsed.path.rstrip('/').endswith('/weather'):
+                    server._count('not_found')
+                    return self._send(404, {'cod': '404', 'message': 'Not found'})
+
+                latency, status = server._next_outcome()
+                time.sleep(latency)
+
+                if status == 429:
+                    server._count('rate_limited')
+                    return self._send(429, {'cod': 429, 'message': 'Your account is temporary blocked due to exceeding of requests limitation of your subscription type.'}, {'Retry-After': '1'})
+                if status == 500:
+                    server._count('errors')
+                    return self._send(500, {'cod': 500, 'message': 'Internal error'})
+                if 'q' not in query and not ('lat' in query and 'lon' in query):
+                    server._count('not_found')
+                    return self._send(400, {'cod': '400', 'message': 'Nothing to geocode'})
+
+                server._count('ok')
+                self._send(200, server.payload(query.get('q'), query.get('lat'), query.get('lon')))
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
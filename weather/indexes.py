@@ -0,0 +1,188 @@
+"""
+Index definitions and query plan checks for the weather readings collection
+"""
+from datetime import datetime
+import logging
+import threading
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from . import timeseries
+
+logger = logging.getLogger(__name__)
+
+# Latest reading for a city, optionally for one date (get_weather_from_mongodb).
+# Both are needed: without ``date`` in the filter the second index cannot
+# return documents in saved_at order and the server would sort in memory.
+WEATHER_DATA_INDEXES = [
+    IndexModel([('city', ASCENDING), ('saved_at', DESCENDING)], name='city_saved_at'),
+    IndexModel([('city', ASCENDING), ('date', ASCENDING), ('saved_at', DESCENDING)], name='city_date_saved_at'),
+]
+
+# Sample window for the range queries below (the plan does not depend on the dates)
+_RANGE = {'$gte': datetime(2024, 1, 1), '$lt': datetime(2024, 1, 8)}
+
+# (name, filter, sort, index it must use) for every find the app runs on a hot path
+HOT_QUERIES = [
+    ('latest_for_city', {'city': 'London'}, [('saved_at', DESCENDING)], 'city_saved_at'),
+    ('latest_for_city_on_date', {'city': 'London', 'date': '2024-01-01'}, [('saved_at', DESCENDING)],
+     'city_date_saved_at'),
+    ('range_for_city', {'city': 'London', 'saved_at': _RANGE}, [('saved_at', ASCENDING)], 'city_saved_at'),
+]
+
+# Same access pattern on a time-series collection, where the city lives in the metaField
+TIMESERIES_INDEXES = [
+    IndexModel([('meta.city', ASCENDING), ('saved_at', DESCENDING)], name='meta_city_saved_at'),
+    IndexModel([('meta.city', ASCENDING), ('date', ASCENDING), ('saved_at', DESCENDING)], name='meta_city_date_saved_at'),
+]
+
+TIMESERIES_HOT_QUERIES = [
+    ('latest_for_city', {'meta.city': 'London'}, [('saved_at', DESCENDING)], 'meta_city_saved_at'),
+    ('latest_for_city_on_date', {'meta.city': 'London', 'date': '2024-01-01'}, [('saved_at', DESCENDING)],
+     'meta_city_date_saved_at'),
+    ('range_for_city', {'meta.city': 'London', 'saved_at': _RANGE}, [('saved_at', ASCENDING)],
+     'meta_city_saved_at'),
+]
+
+# Plan stages that mean a query scans the whole collection or sorts in memory
+BAD_STAGES = {'COLLSCAN', 'SORT'}
+
+
+def index_models():
+    """Indexes for the readings collection in the current storage mode"""
+    return TIMESERIES_INDEXES if timeseries.is_timeseries() else WEATHER_DATA_INDEXES
+
+
+def hot_queries():
+    return TIMESERIES_HOT_QUERIES if timeseries.is_timeseries() else HOT_QUERIES
+
+
+def hot_pipelines():
+    """(name, pipeline, index it must use) for the hot aggregations in the current storage mode"""
+    index = 'meta_city_saved_at' if timeseries.is_timeseries() else 'city_saved_at'
+    return [
+        ('latest_per_day', timeseries.latest_per_day_pipeline('London', _RANGE['$gte'], _RANGE['$lt']), index),
+    ]
+
+
+def _get_collection(collection):
+    if collection is not None:
+        return collection
+    from weather_health_app.mongodb import get_collection
+    return get_collection(timeseries.readings_collection_name())
+
+
+def ensure_indexes(collection=None):
+    """Create any missing readings indexes; return the index names or None if MongoDB is unavailable
+
+    ``create_indexes`` is a no-op for indexes that already exist with the same
+    keys and options, so this is safe to run on every deploy. In time-series
+    mode the collection itself is created first.
+    """
+    if collection is None and timeseries.is_timeseries() and timeseries.ensure_timeseries_collection() is None:
+        return None
+    collection = _get_collection(collection)
+    if collection is None:
+        logger.error("Cannot ensure weather reading indexes: MongoDB is unavailable")
+        return None
+    names = collection.create_indexes(index_models())
+    logger.info(f"{collection.name} indexes ensured: {', '.join(names)}")
+    return names
+
+
+def explain_hot_queries(collection=None):
+    """Return the plan stages and indexes of each hot query, and whether it is served by its index
+
+    A query is ``ok`` only if its plan has an IXSCAN on the expected index
+    and no collection scan or in-memory sort. The query planner is looked
+    up wherever the explain output puts it, including aggregate-style
+    output (``stages[0]['$cursor']['queryPlanner']``), which is what
+    time-series collections and pipelines return.
+    """
+    collection = _get_collection(collection)
+    if collection is None:
+        return None
+    explains = [
+        (name, collection.find(query).sort(sort).limit(1).explain(), index)
+        for name, query, sort, index in hot_queries()
+    ]
+    explains.extend(
+        (name, collection.database.command('aggregate', collection.name, pipeline=pipeline, explain=True), index)
+        for name, pipeline, index in hot_pipelines()
+    )
+
+    plans = {}
+    for name, explain, index in explains:
+        stages, indexes = [], []
+        for planner in _query_planners(explain):
+            _walk_plan(planner.get('winningPlan', {}), stages, indexes)
+        plans[name] = {
+            'stages': stages,
+            'indexes': indexes,
+            'expected_index': index,
+            'ok': 'IXSCAN' in stages and index in indexes and not BAD_STAGES.intersection(stages),
+        }
+    return plans
+
+
+def check_query_plans(collection=None):
+    """Return a list of problems, empty when every hot query is served by an index"""
+    plans = explain_hot_queries(collection)
+    if plans is None:
+        return ['MongoDB is unavailable']
+    problems = []
+    for name, plan in plans.items():
+        if plan['ok']:
+            continue
+        bad_stages = [stage for stage in plan['stages'] if stage in BAD_STAGES]
+        if bad_stages:
+            problems.append(f"{name} uses {', '.join(bad_stages)}")
+        elif not plan['stages']:
+            problems.append(f"{name}: no query plan found in explain output")
+        else:
+            problems.append(f"{name} does not scan index {plan['expected_index']}")
+    return problems
+
+
+def _query_planners(explain):
+    """Every ``queryPlanner`` section in an explain result, however deeply it is nested"""
+    if isinstance(explain, list):
+        for item in explain:
+            yield from _query_planners(item)
+    elif isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'queryPlanner' and isinstance(value, dict):
+                yield value
+            else:
+                yield from _query_planners(value)
+
+
+def _walk_plan(plan, stages, indexes):
+    """Collect stage names and index names from a (possibly nested) explain plan"""
+    if isinstance(plan, list):
+        for child in plan:
+            _walk_plan(child, stages, indexes)
+        return
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        stages.append(plan['stage'])
+    if 'indexName' in plan:
+        indexes.append(plan['indexName'])
+    # Classic plans nest through inputStage(s); slot-based plans wrap them in queryPlan
+    for key in ('queryPlan', 'inputStage', 'inputStages'):
+        if key in plan:
+            _walk_plan(plan[key], stages, indexes)
+
+
+def ensure_indexes_in_background():
+    """Ensure indexes from a daemon thread so startup never waits on MongoDB"""
+    def run():
+        try:
+            ensure_indexes()
+        except Exception as e:
+            logger.error(f"Ensuring weather reading indexes failed: {e}")
+
+    thread = threading.Thread(target=run, name='weather-indexes', daemon=True)
+    thread.start()
+    return thread
@@ -4,6 +4,34 @@ Enhanced weather recommendations specifically for Indian climate conditions
 from datetime import datetime, timedelta
 import random
 
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Timeline fields read by get_trigger_masks, with the per-snapshot defaults
+_TIMELINE_DEFAULTS = {
+    'temperature': 25,
+    'humidity': 50,
+    'air_quality_index': 3,
+    'uv_index': 5,
+    'monsoon_intensity': 'none',
+    'dust_storm_risk': 'low',
+}
+
+
+def _elif(*conditions):
+    """Masks for an if/elif chain: each condition only where no earlier one held"""
+    taken = np.zeros(conditions[0].shape, dtype=bool)
+    masks = []
+    for condition in conditions:
+        masks.append(condition & ~taken)
+        taken = taken | condition
+    return masks
+
+
 class IndianClimateRecommendations:
     """Enhanced recommendations for Indian weather conditions"""
     
@@ -336,3 +364,73 @@ class IndianClimateRecommendations:
                 })
         
         return recommendations
+    
+    @staticmethod
+    def get_trigger_masks(timeline, user_role=None):
+        """Evaluate every rule above over T timesteps in one vectorized pass
+        
+        ``timeline`` maps the weather fields the rules read (temperature,
+        humidity, air_quality_index, uv_index, monsoon_intensity,
+        dust_storm_risk) to length-T arrays or scalars; missing fields take
+        the same defaults as the per-snapshot methods. Returns a dict of
+        recommendation title -> boolean array, in the order the per-snapshot
+        methods emit them: ``masks[title][t]`` is True when that
+        recommendation is produced for timestep ``t``.
+        """
+        if np is None:
+            raise ImproperlyConfigured("numpy is required for vectorized recommendation timelines")
+        
+        temp, humidity, aqi, uv_index, monsoon_intensity, dust_storm_risk = np.broadcast_arrays(*(
+            np.atleast_1d(np.asarray(timeline.get(name, default))) for name, default in _TIMELINE_DEFAULTS.items()
+        ))
+        hot_humid = (temp > 30) & (humidity > 70)
+        
+        extreme_heat, very_hot, hot_and_humid, pleasant, cool = _elif(
+            temp > 40, temp > 35, hot_humid, (temp >= 22) & (temp <= 30), temp < 22
+        )
+        heavy_monsoon, moderate_monsoon, pre_monsoon = _elif(
+            monsoon_intensity == 'heavy',
+            monsoon_intensity == 'moderate',
+            (monsoon_intensity == 'pre_monsoon') & (humidity > 85),
+        )
+        severe_pollution, moderate_pollution = _elif(aqi >= 4, aqi == 3)
+        dust_storm, dust_storm_possible = _elif(dust_storm_risk == 'high', dust_storm_risk == 'moderate')
+        extreme_uv, very_high_uv, high_uv = _elif(uv_index >= 11, uv_index >= 8, uv_index >= 6)
+        
+        masks = {
+            # get_temperature_recommendations
+            'EXTREME HEAT ALERT': extreme_heat,
+            'AC Optimization for Extreme Heat': extreme_heat,
+            'Very Hot Weather': very_hot,
+            'Smart Home Heat Management': very_hot,
+            'Hot & Humid Conditions': hot_and_humid,
+            'Humidity Control': hot_and_humid,
+            'Pleasant Weather': pleasant,
+            'Cold Weather': cool & (temp < 10),
+            'Cool Weather': cool & ~(temp < 10),
+            # get_monsoon_recommendations
+            'Heavy Monsoon Alert': heavy_monsoon,
+            'Monsoon Home Protection': heavy_monsoon,
+            'Moderate Rainfall': moderate_monsoon,
+            'Pre-Monsoon Humidity': pre_monsoon,
+            # get_air_quality_recommendations
+            'SEVERE AIR POLLUTION': severe_pollution,
+            'Air Purification Mode': severe_pollution,
+            'Moderate Air Pollution': moderate_pollution,
+            'DUST STORM WARNING': dust_storm,
+            'Dust Storm Possible': dust_storm_possible,
+            # get_uv_recommendations
+            'EXTREME UV RADIATION': extreme_uv,
+            'Very High UV Radiation': very_high_uv,
+            'High UV Radiation': high_uv,
+        }
+        
+        # get_role_specific_recommendations
+        if user_role == 'athlete':
+            masks['Exercise Safety Alert'], masks['Modified Training Schedule'] = _elif(temp > 35, hot_humid)
+        elif user_role == 'elderly':
+            masks['Elderly Safety Alert'] = (temp > 35) | (aqi >= 4)
+        elif user_role == 'patient':
+            masks['Patient Health Alert'] = aqi >= 4
+        
+        return masks
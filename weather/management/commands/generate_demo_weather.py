@@ -0,0 +1,44 @@
+"""
+Generate large synthetic weather histories for load tests
+"""
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from weather import timeseries
+from weather.demo_weather import generate_columns
+
+
+class Command(BaseCommand):
+    help = 'Generate demo weather for N cities x D days in one vectorized pass and optionally insert it into MongoDB'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=100, help='Number of synthetic cities')
+        parser.add_argument('--days', type=int, default=365, help='Days of history per city')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--insert', action='store_true', help='Bulk insert the readings into the readings collection')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cities = [f"Demo City {i}" for i in range(options['cities'])]
+
+        started = time.perf_counter()
+        columns = generate_columns(cities, options['days'], seed=options['seed'])
+        self.stdout.write(f"Generated {len(columns)} readings in {time.perf_counter() - started:.2f}s")
+
+        if options['insert']:
+            from weather_health_app.mongodb import get_collection
+
+            collection = get_collection(timeseries.readings_collection_name())
+            try:
+                ready = collection is not None and timeseries.ensure_readings_collection()
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            if not ready:
+                raise CommandError('MongoDB is unavailable')
+            started = time.perf_counter()
+            inserted = columns.insert_into(collection, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"Inserted {inserted} readings into {collection.name} in {time.perf_counter() - started:.2f}s"
+            )
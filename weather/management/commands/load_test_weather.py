@@ -0,0 +1,88 @@
+"""
+Benchmark the fetch, format and recommend pipeline against the local OpenWeather stand-in
+"""
+from concurrent import futures
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from weather.fake_openweather import FakeOpenWeatherServer
+
+ROLES = ['athlete', 'patient', 'elderly', 'doctor', 'pharmacist', 'public']
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive WeatherService and the recommendation engine with concurrent lookups '
+        'against an in-process fake OpenWeather server and report throughput and tail latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--cities', type=int, default=50, help='Number of distinct cities requested')
+        parser.add_argument('--latency-ms', type=float, default=50)
+        parser.add_argument('--jitter-ms', type=float, default=20)
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+        parser.add_argument('--no-cache', action='store_true', help='Send every lookup upstream')
+        parser.add_argument('--respect-rate-limit', action='store_true',
+                            help='Keep the configured client-side rate limiter instead of disabling it')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        server = FakeOpenWeatherServer(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            seed=options['seed'],
+        ).start()
+
+        # Settings are read when the shared client and cache are first built
+        settings.WEATHER_API_URL = server.url
+        settings.WEATHER_API_KEY = 'load-test'
+        settings.WEATHER_API_POOL_MAXSIZE = max(getattr(settings, 'WEATHER_API_POOL_MAXSIZE', 20), options['concurrency'])
+        if options['no_cache']:
+            settings.WEATHER_CACHE_TTL = 0
+            settings.WEATHER_CACHE_STALE_TTL = 0
+        if not options['respect_rate_limit']:
+            settings.WEATHER_API_RATE_LIMIT_FILE = None
+            settings.WEATHER_API_RATE_LIMIT_PER_MINUTE = 10 ** 9
+            settings.WEATHER_API_RATE_LIMIT_BURST = 10 ** 9
+
+        from weather.models import WeatherService
+        from weather.health_recommendations import HealthRecommendationEngine
+
+        cities = [f"City {i}" for i in range(options['cities'])]
+
+        def one_request(i):
+            started = time.perf_counter()
+            weather = WeatherService.get_current_weather(cities[i % len(cities)])
+            HealthRecommendationEngine.get_recommendations(weather, ROLES[i % len(ROLES)], 'asthma,diabetes')
+            return time.perf_counter() - started, weather.get('country') == 'Demo'
+
+        started = time.perf_counter()
+        with futures.ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(one_request, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        server.stop()
+
+        latencies = sorted(latency for latency, _ in results)
+        demo = sum(1 for _, is_demo in results if is_demo)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100.0 * len(latencies)))] * 1000
+
+        self.stdout.write(f"requests={len(results)} concurrency={options['concurrency']} elapsed={elapsed:.2f}s")
+        self.stdout.write(f"throughput={len(results) / elapsed:.1f} req/s")
+        self.stdout.write(
+            f"latency_ms p50={percentile(50):.1f} p95={percentile(95):.1f} "
+            f"p99={percentile(99):.1f} max={latencies[-1] * 1000:.1f}"
+        )
+        self.stdout.write(f"demo_fallbacks={demo}")
+        self.stdout.write(f"upstream={server.stats()}")
+        self.stdout.write(f"cache={WeatherService.get_cache_stats()}")
+        api_stats = WeatherService.get_api_stats()
+        self.stdout.write(f"circuit_breaker={api_stats['circuit_breaker']['state']} rate_limit={api_stats['rate_limit']}")
@@ -0,0 +1,75 @@
+"""
+Run the weather prefetch scheduler as a standalone process
+"""
+from datetime import datetime, timedelta
+import time
+
+from django.core.management.base import BaseCommand
+
+from weather import timeseries
+from weather.models import WeatherService
+from weather.prefetch import create_prefetch_scheduler
+from weather_health_app.mongodb import get_collection
+
+
+class Command(BaseCommand):
+    help = (
+        'Keep the most requested cities refreshed ahead of cache expiry. '
+        'Popularity is seeded from recently stored readings and --city; '
+        'with --save refreshed readings are stored in MongoDB, where web '
+        'workers with WEATHER_USE_SAVED_READINGS enabled serve them on a '
+        'cache miss instead of calling the API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--city', action='append', default=[], help='City to keep warm (repeatable)')
+        parser.add_argument('--seed-hours', type=int, default=24,
+                            help='Seed popularity from snapshots saved in the last N hours (0 to skip)')
+        parser.add_argument('--top-k', type=int, help='Number of cities to keep warm')
+        parser.add_argument('--interval', type=float, help='Seconds between scheduler cycles')
+        parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+        parser.add_argument('--save', action='store_true', help='Save refreshed readings to MongoDB')
+
+    def handle(self, *args, **options):
+        def refresh_and_save(city):
+            return WeatherService.refresh_current_weather(city, save=True)
+
+        scheduler = create_prefetch_scheduler(refresh_and_save if options['save'] else None)
+        if options['top_k']:
+            scheduler.top_k = options['top_k']
+        if options['interval']:
+            scheduler.interval = options['interval']
+
+        for city in options['city']:
+            scheduler.record(city)
+        if options['seed_hours']:
+            self._seed_from_mongodb(scheduler, options['seed_hours'])
+
+        while True:
+            refreshed = scheduler.run_once()
+            stats = scheduler.stats()
+            self.stdout.write(
+                f"refreshed={refreshed} queue_depth={stats['queue_depth']} "
+                f"last_lag={stats['last_refresh_lag']:.1f}s max_lag={stats['max_refresh_lag']:.1f}s "
+                f"failures={stats['refresh_failures']}"
+            )
+            if options['once']:
+                break
+            time.sleep(scheduler.interval)
+
+    def _seed_from_mongodb(self, scheduler, hours):
+        collection = get_collection(timeseries.readings_collection_name())
+        if collection is None:
+            return
+        try:
+            pipeline = [
+                {'$match': {'saved_at': {'$gte': datetime.now() - timedelta(hours=hours)}}},
+                {'$group': {'_id': f"${timeseries.city_field()}", 'count': {'$sum': 1}}},
+                {'$sort': {'count': -1}},
+                {'$limit': scheduler.max_tracked},
+            ]
+            for row in collection.aggregate(pipeline):
+                for _ in range(min(row['count'], 100)):
+                    scheduler.record(row['_id'])
+        except Exception as e:
+            self.stderr.write(f"Could not seed popularity from MongoDB: {e}")
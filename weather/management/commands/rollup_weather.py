@@ -0,0 +1,33 @@
+"""
+Downsample stored weather readings into daily per-city rollups
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from weather import timeseries
+
+
+class Command(BaseCommand):
+    help = 'Merge per-city daily averages, minima and maxima of weather readings into the rollup collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Number of days up to and including today to recompute')
+        parser.add_argument('--setup', action='store_true',
+                            help='Create the time-series collection (or update its expiry) before rolling up')
+
+    def handle(self, *args, **options):
+        if options['setup']:
+            if not timeseries.is_timeseries():
+                raise CommandError("--setup requires WEATHER_STORAGE_MODE = 'timeseries'")
+            name = timeseries.ensure_timeseries_collection()
+            if name is None:
+                raise CommandError('MongoDB is unavailable')
+            self.stdout.write(f"Time-series collection {name} is ready")
+
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=options['days'] - 1)
+        rollups = timeseries.rollup_daily(start=start, end=today + timedelta(days=1))
+        if rollups is None:
+            raise CommandError('MongoDB is unavailable')
+        self.stdout.write(f"{rollups} daily rollups in {timeseries.rollup_collection_name()} since {start.date()}")
@@ -0,0 +1,41 @@
+"""
+Serve the local OpenWeather stand-in for offline load and latency testing
+"""
+from django.core.management.base import BaseCommand
+
+from weather.fake_openweather import FakeOpenWeatherServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake of the OpenWeather /weather endpoint (point WEATHER_API_URL at it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=50, help='Mean injected latency')
+        parser.add_argument('--jitter-ms', type=float, default=20, help='Standard deviation of injected latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 429')
+        parser.add_argument('--rate-limit-per-second', type=int, default=0,
+                            help='Answer 429 once this many requests arrive within one second (0 = off)')
+        parser.add_argument('--seed', type=int, help='Seed for injected latency and failures')
+
+    def handle(self, *args, **options):
+        server = FakeOpenWeatherServer(
+            host=options['host'],
+            port=options['port'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            rate_limit_per_second=options['rate_limit_per_second'],
+            seed=options['seed'],
+        )
+        self.stdout.write(f"Fake OpenWeather listening, set WEATHER_API_URL={server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f"Served: {server.stats()}")
@@ -0,0 +1,30 @@
+"""
+Create the weather reading indexes and verify the hot queries use them
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from weather.indexes import check_query_plans, ensure_indexes, explain_hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Ensure the weather reading indexes exist (idempotent) and optionally check query plans with explain()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Fail unless every hot query scans its index without sorting in memory')
+        parser.add_argument('--no-create', action='store_true', help='Only run the query plan check')
+
+    def handle(self, *args, **options):
+        if not options['no_create']:
+            names = ensure_indexes()
+            if names is None:
+                raise CommandError('MongoDB is unavailable')
+            self.stdout.write(f"Ensured {len(names)} indexes: {', '.join(names)}")
+
+        if options['check'] or options['no_create']:
+            for name, plan in (explain_hot_queries() or {}).items():
+                self.stdout.write(f"{name}: stages={' > '.join(plan['stages'])} indexes={plan['indexes']}")
+            problems = check_query_plans()
+            if problems:
+                raise CommandError('; '.join(problems))
+            self.stdout.write(self.style.SUCCESS('All hot weather reading queries use an index'))
@@ -1,38 +1,457 @@
 from django.db import models
-from weather_health_app.mongodb import get_collection
+from weather_health_app.mongodb import get_collection, mongodb
 from datetime import datetime, timedelta
 import random
 import json
+import threading
+import asyncio
+from concurrent import futures
+from .cache import TTLCache, SingleFlight, AsyncSingleFlight
+from .weather_client import get_weather_client, get_async_weather_client, WeatherAPIUnavailable
+from .rate_limit import get_rate_limiter
+from .circuit_breaker import get_weather_circuit_breaker
+from .prefetch import get_prefetch_scheduler
+from .write_buffer import get_write_buffer
+from . import demo_weather, timeseries
+from .async_repository import get_async_weather_repository
+
+_weather_cache = None
+_weather_cache_lock = threading.Lock()
+_weather_flights = SingleFlight()
+_async_weather_flights = AsyncSingleFlight()
+_batch_executor = None
+_readings_cache = None
+_readings_cache_lock = threading.Lock()
+_history_cache = None
+_history_cache_lock = threading.Lock()
+
+# Stored reading fields that replace generated values in historical views
+_HISTORY_FIELDS = (
+    'temperature', 'feels_like', 'humidity', 'pressure', 'description', 'icon', 'wind_speed',
+    'wind_direction', 'visibility', 'uv_index', 'air_quality_index', 'timestamp',
+)
+
 
 class WeatherService:
     """Service class for weather data management"""
 
     @staticmethod
     def get_current_weather(city="London"):
-        """Get current weather data from API or demo data"""
+        """Get current weather data from cache, API or demo data"""
+        get_prefetch_scheduler().record(city)
+        return WeatherService._get_current_weather(
+            WeatherService._cache_key(city), {'q': city}, city
+        )
+
+    @staticmethod
+    def get_current_weather_by_coordinates(lat, lon, name=None):
+        """Get current weather for the lat/lon grid cell containing a location"""
+        lat, lon = round(float(lat), 2), round(float(lon), 2)
+        return WeatherService._get_current_weather(
+            WeatherService._coordinates_cache_key(lat, lon),
+            {'lat': lat, 'lon': lon},
+            name or f"{lat}, {lon}"
+        )
+
+    @staticmethod
+    def _get_current_weather(key, query, city):
+        """Serve a location from the cache, sharing one upstream fetch per key"""
+        cache = WeatherService.get_cache()
+
+        cached = cache.get(key, refresh=lambda: WeatherService._fetch_shared(key, query))
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            weather_data = WeatherService._fetch_shared(key, query)
+        except WeatherAPIUnavailable as e:
+            return WeatherService._get_stale_weather(key, city, e.reason)
+        if weather_data is not None:
+            return dict(weather_data)
+
+        # Fallback to demo data
+        return WeatherService._get_demo_current_weather(city)
+
+    @staticmethod
+    def _get_stale_weather(key, city, reason):
+        """Serve the last known reading, however old, flagged as stale"""
+        cached = WeatherService.get_cache().peek(key)
+        if cached is not None:
+            weather_data, age = cached
+            weather_data = dict(weather_data)
+            age = round(age)
+        else:
+            weather_data = WeatherService._get_demo_current_weather(city)
+            age = None
+
+        weather_data.update({'stale': True, 'stale_reason': reason, 'data_age_seconds': age})
+        return weather_data
+
+    @staticmethod
+    def _fetch_shared(key, query, force=False):
+        """Fetch, format and cache a location once for all concurrent callers"""
+        def fetch():
+            cache = WeatherService.get_cache()
+            # Another flight may have filled the cache since our lookup missed
+            cached = cache.peek(key)
+            if not force and cached is not None and cached[1] < cache.ttl:
+                return cached[0]
+
+            # A reading saved by another process (e.g. prefetch_weather --save) saves an API call
+            if not force and 'q' in query:
+                saved = WeatherService._get_saved_current_weather(query['q'], cache.ttl)
+                if saved is not None:
+                    weather_data, age = saved
+                    cache.set(key, weather_data, age=age)
+                    return weather_data
+
+            weather_data = WeatherService._fetch_current_weather(query)
+            if weather_data is not None:
+                cache.set(key, weather_data)
+            return weather_data
+
+        return _weather_flights.do(key, fetch)
+
+    @staticmethod
+    def _fetch_current_weather(query):
+        """Fetch and format current weather from the API, or None if unavailable"""
         try:
-            import requests
-            from django.conf import settings
+            client = get_weather_client()
 
             # Try to get real weather data
-            if settings.WEATHER_API_KEY != 'demo_key':
-                url = f"{settings.WEATHER_API_URL}/weather"
-                params = {
-                    'q': city,
-                    'appid': settings.WEATHER_API_KEY,
-                    'units': 'metric'
-                }
-                response = requests.get(url, params=params, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    return WeatherService._format_weather_data(data)
-
-            # Fallback to demo data
-            return WeatherService._get_demo_current_weather(city)
+            if client.enabled:
+                data = client.current_weather(**query)
+                return WeatherService._format_weather_data(data)
 
+        except WeatherAPIUnavailable:
+            raise
         except Exception as e:
             print(f"Error fetching weather: {e}")
-            return WeatherService._get_demo_current_weather(city)
+        return None
+
+    @staticmethod
+    def get_current_weather_many(cities):
+        """Get current weather for many cities at once, keyed by city
+
+        Duplicate cities (after normalization) are fetched once, cached
+        cities are served from memory and the misses are fetched in
+        parallel on a bounded pool. Cities that fail or are not back within
+        WEATHER_BATCH_TIMEOUT fall back to demo data without holding up the
+        rest of the batch.
+        """
+        from django.conf import settings
+
+        cache = WeatherService.get_cache()
+        results = {}
+        pending = {}  # key -> (city, future)
+        batch = WeatherService._dedupe_cities(cities)
+
+        for key, city in batch.items():
+            get_prefetch_scheduler().record(city)
+            query = {'q': city}
+            cached = cache.get(key, refresh=lambda key=key, query=query: WeatherService._fetch_shared(key, query))
+            if cached is not None:
+                results[key] = dict(cached)
+            else:
+                pending[key] = (city, WeatherService._get_batch_executor().submit(
+                    WeatherService._fetch_shared, key, query
+                ))
+
+        if pending:
+            futures.wait(
+                [future for _, future in pending.values()],
+                timeout=getattr(settings, 'WEATHER_BATCH_TIMEOUT', 5)
+            )
+        for key, (city, future) in pending.items():
+            weather_data = None
+            if future.done():
+                if isinstance(future.exception(), WeatherAPIUnavailable):
+                    results[key] = WeatherService._get_stale_weather(key, city, future.exception().reason)
+                    continue
+                if future.exception() is None:
+                    weather_data = future.result()
+            if weather_data is not None:
+                results[key] = dict(weather_data)
+            else:
+                results[key] = WeatherService._get_demo_current_weather(city)
+
+        return {city: dict(results[WeatherService._cache_key(city)]) for city in cities}
+
+    @staticmethod
+    async def aget_current_weather_many(cities):
+        """Async counterpart of get_current_weather_many"""
+        from django.conf import settings
+
+        batch = WeatherService._dedupe_cities(cities)
+        limit = asyncio.Semaphore(getattr(settings, 'WEATHER_BATCH_MAX_WORKERS', 8))
+
+        async def fetch(key, city):
+            get_prefetch_scheduler().record(city)
+            async with limit:
+                return await WeatherService._aget_current_weather(key, {'q': city}, city)
+
+        tasks = {key: asyncio.ensure_future(fetch(key, city)) for key, city in batch.items()}
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=getattr(settings, 'WEATHER_BATCH_TIMEOUT', 5))
+
+        results = {}
+        for key, task in tasks.items():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                results[key] = task.result()
+            else:
+                task.cancel()
+                results[key] = WeatherService._get_demo_current_weather(batch[key])
+
+        return {city: dict(results[WeatherService._cache_key(city)]) for city in cities}
+
+    @staticmethod
+    def _dedupe_cities(cities):
+        """Map each distinct cache key to the first spelling of its city"""
+        batch = {}
+        for city in cities:
+            batch.setdefault(WeatherService._cache_key(city), city)
+        return batch
+
+    @staticmethod
+    def _get_batch_executor():
+        """Get the shared thread pool used for batch fetches"""
+        global _batch_executor
+        if _batch_executor is None:
+            with _weather_cache_lock:
+                if _batch_executor is None:
+                    from django.conf import settings
+                    _batch_executor = futures.ThreadPoolExecutor(
+                        max_workers=getattr(settings, 'WEATHER_BATCH_MAX_WORKERS', 8),
+                        thread_name_prefix='weather-batch'
+                    )
+        return _batch_executor
+
+    @staticmethod
+    async def aget_current_weather(city="London"):
+        """Async counterpart of get_current_weather for ASGI views and consumers"""
+        get_prefetch_scheduler().record(city)
+        return await WeatherService._aget_current_weather(
+            WeatherService._cache_key(city), {'q': city}, city
+        )
+
+    @staticmethod
+    async def aget_current_weather_by_coordinates(lat, lon, name=None):
+        """Async counterpart of get_current_weather_by_coordinates"""
+        lat, lon = round(float(lat), 2), round(float(lon), 2)
+        return await WeatherService._aget_current_weather(
+            WeatherService._coordinates_cache_key(lat, lon),
+            {'lat': lat, 'lon': lon},
+            name or f"{lat}, {lon}"
+        )
+
+    @staticmethod
+    async def _aget_current_weather(key, query, city):
+        """Serve a location from the cache, sharing one awaited fetch per key"""
+        cache = WeatherService.get_cache()
+
+        # Stale entries are refreshed by the cache's background thread
+        cached = cache.get(key, refresh=lambda: WeatherService._fetch_shared(key, query))
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            weather_data = await WeatherService._afetch_shared(key, query)
+        except WeatherAPIUnavailable as e:
+            return WeatherService._get_stale_weather(key, city, e.reason)
+        if weather_data is not None:
+            return dict(weather_data)
+
+        # Fallback to demo data
+        return WeatherService._get_demo_current_weather(city)
+
+    @staticmethod
+    async def _afetch_shared(key, query):
+        """Fetch, format and cache a location once per event loop"""
+        async def fetch():
+            cache = WeatherService.get_cache()
+            cached = cache.peek(key)
+            if cached is not None and cached[1] < cache.ttl:
+                return cached[0]
+
+            if 'q' in query:
+                saved = await WeatherService._aget_saved_current_weather(query['q'], cache.ttl)
+                if saved is not None:
+                    weather_data, age = saved
+                    cache.set(key, weather_data, age=age)
+                    return weather_data
+
+            weather_data = await WeatherService._afetch_current_weather(query)
+            if weather_data is not None:
+                cache.set(key, weather_data)
+            return weather_data
+
+        return await _async_weather_flights.do(key, fetch)
+
+    @staticmethod
+    async def _afetch_current_weather(query):
+        """Fetch and format current weather without blocking the event loop"""
+        try:
+            client = get_async_weather_client()
+
+            if client.enabled:
+                data = await client.current_weather(**query)
+                return WeatherService._format_weather_data(data)
+
+        except WeatherAPIUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error fetching weather: {e}")
+        return None
+
+    @staticmethod
+    def get_cache():
+        """Get the shared per-city current weather cache"""
+        global _weather_cache
+        if _weather_cache is None:
+            with _weather_cache_lock:
+                if _weather_cache is None:
+                    from django.conf import settings
+                    _weather_cache = TTLCache(
+                        ttl=getattr(settings, 'WEATHER_CACHE_TTL', 600),
+                        stale_ttl=getattr(settings, 'WEATHER_CACHE_STALE_TTL', 1800),
+                        max_entries=getattr(settings, 'WEATHER_CACHE_MAX_ENTRIES', 1000),
+                    )
+        return _weather_cache
+
+    @staticmethod
+    def refresh_current_weather(city, save=False):
+        """Re-fetch a city into the cache even if its entry is still fresh
+
+        With ``save`` the fresh reading is also stored in MongoDB, where the
+        cache misses of other processes pick it up.
+        """
+        weather_data = WeatherService._fetch_shared(
+            WeatherService._cache_key(city), {'q': city}, force=True
+        )
+        if weather_data is None:
+            return False
+        return WeatherService._insert_weather(weather_data) if save else True
+
+    @staticmethod
+    def _get_saved_current_weather(city, max_age):
+        """Latest stored reading for a city and its age in seconds, if it is younger than ``max_age``
+
+        Skipped without an API key (misses are never cached then, so every
+        request would pay the lookup) and unless the health probe has seen
+        MongoDB up.
+        """
+        from django.conf import settings
+        if not getattr(settings, 'WEATHER_USE_SAVED_READINGS', False) or not get_weather_client().enabled:
+            return None
+        try:
+            collection = get_collection(timeseries.readings_collection_name())
+            if collection is None or mongodb.is_healthy is not True:
+                return None
+            reading = timeseries.from_storage_document(
+                collection.find_one({timeseries.city_field(): city}, sort=[('saved_at', -1)])
+            )
+        except Exception as e:
+            print(f"Error fetching weather from MongoDB: {e}")
+            return None
+        return WeatherService._fresh_saved_reading(reading, max_age)
+
+    @staticmethod
+    async def _aget_saved_current_weather(city, max_age):
+        """Async version of _get_saved_current_weather"""
+        from django.conf import settings
+        if not getattr(settings, 'WEATHER_USE_SAVED_READINGS', False) or not get_async_weather_client().enabled:
+            return None
+        if mongodb.is_healthy is not True:
+            return None
+        try:
+            reading = await get_async_weather_repository().latest_for_city(city)
+        except Exception as e:
+            print(f"Error fetching weather from MongoDB: {e}")
+            return None
+        return WeatherService._fresh_saved_reading(reading, max_age)
+
+    @staticmethod
+    def _fresh_saved_reading(reading, max_age):
+        """``(weather_data, age)`` for a stored API reading younger than ``max_age``, else None
+
+        Demo and stale readings are never served as current weather.
+        """
+        if reading is None or reading.get('country') == 'Demo' or reading.get('stale'):
+            return None
+        saved_at = reading.get('saved_at')
+        if not isinstance(saved_at, datetime):
+            return None
+        age = (datetime.now() - saved_at).total_seconds()
+        if not 0 <= age < max_age:
+            return None
+        weather_data = {field: value for field, value in reading.items() if field not in ('_id', 'saved_at')}
+        return weather_data, age
+
+    @staticmethod
+    def get_cache_expires_in(city):
+        """Seconds until a city's cached weather goes stale, or None if not cached"""
+        return WeatherService.get_cache().expires_in(WeatherService._cache_key(city))
+
+    @staticmethod
+    def get_cache_stats():
+        """Get hit/miss/refresh counters for the current weather cache"""
+        stats = WeatherService.get_cache().stats()
+        stats['flights'] = _weather_flights.stats()
+        stats['async_flights'] = _async_weather_flights.stats()
+        return stats
+
+    @staticmethod
+    def get_api_stats():
+        """Get weather API quota consumption and circuit state for monitoring"""
+        return {
+            'rate_limit': get_rate_limiter().stats(),
+            'circuit_breaker': get_weather_circuit_breaker().stats(),
+        }
+
+    @staticmethod
+    def get_storage_stats():
+        """Get write buffer, stored reading cache and MongoDB connection pool metrics for monitoring"""
+        buffer = get_write_buffer()
+        return {
+            'write_buffer': buffer.stats() if buffer is not None else None,
+            'readings_cache': WeatherService.get_readings_cache().stats(),
+            'mongodb_pool': mongodb.pool_stats(),
+        }
+
+    @staticmethod
+    def get_readings_cache():
+        """Get the read-through cache in front of get_weather_from_mongodb"""
+        global _readings_cache
+        if _readings_cache is None:
+            with _readings_cache_lock:
+                if _readings_cache is None:
+                    from django.conf import settings
+                    _readings_cache = TTLCache(
+                        ttl=getattr(settings, 'WEATHER_READINGS_CACHE_TTL', 60),
+                        stale_ttl=0,
+                        max_entries=getattr(settings, 'WEATHER_READINGS_CACHE_MAX_ENTRIES', 500),
+                    )
+                    # Buffered readings only become visible once flushed
+                    buffer = get_write_buffer()
+                    if buffer is not None:
+                        buffer.add_listener(WeatherService._invalidate_readings)
+        return _readings_cache
+
+    @staticmethod
+    def _invalidate_readings(documents):
+        """Drop cached reads for every city in ``documents``"""
+        cities = {timeseries.from_storage_document(document).get('city') for document in documents}
+        WeatherService.get_readings_cache().invalidate_matching(lambda key: key[0] in cities)
+
+    @staticmethod
+    def _cache_key(city):
+        """Normalize a city name into a cache key"""
+        return ' '.join(str(city).split()).lower()
+
+    @staticmethod
+    def _coordinates_cache_key(lat, lon):
+        """Cache key for a ~1km lat/lon grid cell"""
+        return f"@{round(float(lat), 2)},{round(float(lon), 2)}"
 
     @staticmethod
     def _format_weather_data(api_data):
@@ -69,106 +488,186 @@ class WeatherService:
     @staticmethod
     def _get_demo_current_weather(city="London"):
         """Generate demo current weather data"""
-        weather_conditions = [
-            {'desc': 'Clear sky', 'icon': '01d'},
-            {'desc': 'Few clouds', 'icon': '02d'},
-            {'desc': 'Scattered clouds', 'icon': '03d'},
-            {'desc': 'Broken clouds', 'icon': '04d'},
-            {'desc': 'Light rain', 'icon': '10d'},
-            {'desc': 'Overcast', 'icon': '04d'}
-        ]
-
-        condition = random.choice(weather_conditions)
-        temp = random.randint(15, 30)
-
-        return {
-            'city': city,
-            'country': 'Demo',
-            'temperature': temp,
-            'feels_like': temp + random.randint(-3, 3),
-            'humidity': random.randint(40, 80),
-            'pressure': random.randint(1000, 1025),
-            'description': condition['desc'],
-            'icon': condition['icon'],
-            'wind_speed': random.randint(2, 15),
-            'wind_direction': random.randint(0, 360),
-            'visibility': random.randint(5, 15),
-            'uv_index': random.randint(1, 11),
-            'air_quality_index': random.randint(1, 5),
-            'pollen_count': random.randint(1, 5),
-            'timestamp': datetime.now().isoformat()
-        }
+        return demo_weather.current_weather(city)
 
     @staticmethod
     def get_historical_weather(city="London", days_back=7):
-        """Get historical weather data (demo data for past days)"""
+        """Get daily weather for the past ``days_back`` days, newest first
+
+        The latest stored reading of each day comes from one aggregation over
+        saved_at; days without a stored reading are filled with generated
+        demo data. Whole windows are cached for WEATHER_HISTORY_CACHE_TTL
+        seconds (they only cover days before today, so saves never stale them).
+        """
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cache = WeatherService.get_history_cache()
+        key = (city, today.date().isoformat(), days_back)
+        cached = cache.get(key)
+        if cached is not None:
+            return [dict(day) for day in cached]
+
+        stored = WeatherService._get_stored_days(city, today - timedelta(days=days_back), today)
+        historical_data = WeatherService._build_history(city, days_back, stored or {})
+        if stored is not None:
+            cache.set(key, historical_data)
+        return [dict(day) for day in historical_data]
+
+    @staticmethod
+    async def aget_historical_weather(city="London", days_back=7):
+        """Async counterpart of get_historical_weather"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cache = WeatherService.get_history_cache()
+        key = (city, today.date().isoformat(), days_back)
+        cached = cache.get(key)
+        if cached is not None:
+            return [dict(day) for day in cached]
+
+        try:
+            stored = await get_async_weather_repository().latest_per_day(
+                city, today - timedelta(days=days_back), today, _HISTORY_FIELDS
+            )
+        except Exception as e:
+            print(f"Error fetching weather history from MongoDB: {e}")
+            stored = None
+        historical_data = WeatherService._build_history(city, days_back, stored or {})
+        if stored is not None:
+            cache.set(key, historical_data)
+        return [dict(day) for day in historical_data]
+
+    @staticmethod
+    def get_history_cache():
+        """Get the cache of historical weather windows"""
+        global _history_cache
+        if _history_cache is None:
+            with _history_cache_lock:
+                if _history_cache is None:
+                    from django.conf import settings
+                    _history_cache = TTLCache(
+                        ttl=getattr(settings, 'WEATHER_HISTORY_CACHE_TTL', 900),
+                        stale_ttl=0,
+                        max_entries=getattr(settings, 'WEATHER_HISTORY_CACHE_MAX_ENTRIES', 200),
+                    )
+        return _history_cache
+
+    @staticmethod
+    def _get_stored_days(city, start, end):
+        """Latest stored reading per day in [start, end) keyed by 'YYYY-MM-DD', or None if MongoDB is unavailable"""
+        try:
+            collection = get_collection(timeseries.readings_collection_name())
+            if collection is not None:
+                pipeline = timeseries.latest_per_day_pipeline(city, start, end, _HISTORY_FIELDS)
+                return timeseries.readings_by_day(collection.aggregate(pipeline))
+        except Exception as e:
+            print(f"Error fetching weather history from MongoDB: {e}")
+        return None
+
+    @staticmethod
+    def _build_history(city, days_back, stored):
+        """One entry per past day, from ``stored`` readings where available and demo data otherwise"""
         historical_data = []
 
+        now = datetime.now()
         for i in range(days_back):
-            date = datetime.now() - timedelta(days=i+1)
-
-            # Generate consistent demo data based on date
-            random.seed(date.day + date.month * 31)
-
-            weather_conditions = [
-                {'desc': 'Clear sky', 'icon': '01d'},
-                {'desc': 'Few clouds', 'icon': '02d'},
-                {'desc': 'Scattered clouds', 'icon': '03d'},
-                {'desc': 'Broken clouds', 'icon': '04d'},
-                {'desc': 'Light rain', 'icon': '10d'},
-                {'desc': 'Overcast', 'icon': '04d'}
-            ]
-
-            condition = random.choice(weather_conditions)
-            temp = random.randint(12, 28)
-
-            weather_data = {
-                'date': date.strftime('%Y-%m-%d'),
-                'city': city,
-                'temperature': temp,
-                'feels_like': temp + random.randint(-3, 3),
-                'humidity': random.randint(35, 85),
-                'pressure': random.randint(995, 1030),
-                'description': condition['desc'],
-                'icon': condition['icon'],
-                'wind_speed': random.randint(1, 18),
-                'wind_direction': random.randint(0, 360),
-                'visibility': random.randint(3, 20),
-                'uv_index': random.randint(1, 10),
-                'air_quality_index': random.randint(1, 5),
-                'pollen_count': random.randint(1, 5),
-                'timestamp': date.isoformat()
-            }
+            # Generated per city and date without touching the global random state
+            weather_data = demo_weather.historical_day(city, now - timedelta(days=i+1))
+
+            reading = stored.get(weather_data['date'])
+            if reading is not None:
+                weather_data.update((field, reading[field]) for field in _HISTORY_FIELDS if field in reading)
 
             historical_data.append(weather_data)
 
-        # Reset random seed
-        random.seed()
         return historical_data
 
     @staticmethod
     def save_weather_to_mongodb(weather_data):
         """Save weather data to MongoDB"""
+        get_prefetch_scheduler().record(weather_data.get('city'))
+        return WeatherService._insert_weather(weather_data)
+
+    @staticmethod
+    def _insert_weather(weather_data):
+        """Store a weather reading without counting it as a city request
+
+        The reading is copied (the caller's dict is left untouched) and handed
+        to the write-behind buffer, which inserts it in a batch shortly after;
+        with WEATHER_WRITE_BUFFER_ENABLED off it is inserted synchronously.
+        In time-series mode the first write sets up the time-series collection.
+        """
         try:
-            collection = get_collection('weather_data')
-            if collection is not None:
-                weather_data['saved_at'] = datetime.now()
-                collection.insert_one(weather_data)
+            collection = get_collection(timeseries.readings_collection_name())
+            if collection is not None and timeseries.ensure_readings_collection():
+                document = timeseries.to_storage_document(dict(weather_data, saved_at=datetime.now()))
+                buffer = get_write_buffer()
+                if buffer is not None:
+                    return buffer.add(document)
+                collection.insert_one(document)
+                WeatherService._invalidate_readings([document])
                 return True
         except Exception as e:
             print(f"Error saving weather to MongoDB: {e}")
         return False
 
     @staticmethod
-    def get_weather_from_mongodb(city, date=None):
-        """Get weather data from MongoDB"""
+    def get_weather_from_mongodb(city, date=None, fields=None):
+        """Get the latest stored weather reading for a city (and date) from MongoDB
+
+        ``fields`` limits the reading to those keys (and drops ``_id``).
+        Results are cached per (city, date, fields) for
+        WEATHER_READINGS_CACHE_TTL seconds and invalidated when a reading for
+        the city is written.
+        """
+        fields = tuple(sorted(fields)) if fields else None
+        cache = WeatherService.get_readings_cache()
+        key = (city, date, fields)
+        cached = cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
         try:
-            collection = get_collection('weather_data')
+            collection = get_collection(timeseries.readings_collection_name())
             if collection is not None:
-                query = {'city': city}
+                query = {timeseries.city_field(): city}
                 if date:
                     query['date'] = date
-                return collection.find_one(query, sort=[('saved_at', -1)])
+                reading = timeseries.from_storage_document(
+                    collection.find_one(query, timeseries.projection(fields), sort=[('saved_at', -1)])
+                )
+                if reading is not None:
+                    cache.set(key, reading)
+                    return dict(reading)
+                return None
+        except Exception as e:
+            print(f"Error fetching weather from MongoDB: {e}")
+        return None
+
+    @staticmethod
+    async def asave_weather_to_mongodb(weather_data):
+        """Async counterpart of save_weather_to_mongodb, written directly through Motor"""
+        get_prefetch_scheduler().record(weather_data.get('city'))
+        try:
+            if await get_async_weather_repository().save(weather_data) is not None:
+                WeatherService._invalidate_readings([weather_data])
+                return True
+        except Exception as e:
+            print(f"Error saving weather to MongoDB: {e}")
+        return False
+
+    @staticmethod
+    async def aget_weather_from_mongodb(city, date=None, fields=None):
+        """Async counterpart of get_weather_from_mongodb, sharing its read cache"""
+        fields = tuple(sorted(fields)) if fields else None
+        cache = WeatherService.get_readings_cache()
+        key = (city, date, fields)
+        cached = cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            reading = await get_async_weather_repository().latest_for_city(city, date, fields)
+            if reading is not None:
+                cache.set(key, reading)
+                return dict(reading)
         except Exception as e:
             print(f"Error fetching weather from MongoDB: {e}")
         return None
@@ -0,0 +1,177 @@
+"""
+Background prefetching of current weather for frequently requested cities
+"""
+from collections import Counter
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    """Keep the most requested cities warm in the weather cache.
+
+    Lookups are counted per normalized city. On every cycle the ``top_k``
+    most popular cities are pushed onto a priority queue ordered by when
+    their cache entry needs refreshing (expiry minus ``lead_time``) and then
+    by popularity, and every entry that is due is refreshed. Counts decay
+    each cycle so the ranking follows current demand.
+    """
+
+    def __init__(self, refresh, expires_in, top_k=20, lead_time=60, interval=15,
+                 decay=0.9, max_tracked=1000, clock=time.time):
+        self._refresh = refresh          # callable(city) -> bool
+        self._expires_in = expires_in    # callable(city) -> seconds or None
+        self.top_k = top_k
+        self.lead_time = lead_time
+        self.interval = interval
+        self.decay = decay
+        self.max_tracked = max_tracked
+        self._clock = clock
+
+        self._counts = Counter()
+        self._names = {}
+        self._queue = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'cycles': 0,
+            'refreshed': 0,
+            'refresh_failures': 0,
+            'last_refresh_lag': 0.0,
+            'max_refresh_lag': 0.0,
+        }
+
+    def record(self, city):
+        """Count one request for ``city``, tracking at most ``max_tracked`` cities
+
+        Web workers record every lookup whether or not a scheduler runs in
+        their process, so the bound is enforced here and not only by the
+        per-cycle decay: a new city evicts the least requested one.
+        """
+        if not city:
+            return
+        key = _normalize(city)
+        with self._lock:
+            if key not in self._counts and self._counts and len(self._counts) >= self.max_tracked:
+                coldest = min(self._counts, key=self._counts.__getitem__)
+                del self._counts[coldest]
+                self._names.pop(coldest, None)
+            self._counts[key] += 1
+            self._names.setdefault(key, city)
+
+    def run_once(self):
+        """Refresh every popular city whose cache entry is due; return how many were refreshed"""
+        now = self._clock()
+        with self._lock:
+            popular = self._counts.most_common(self.top_k)
+            names = {key: self._names[key] for key, _ in popular}
+
+        queue = []
+        for key, count in popular:
+            expires_in = self._expires_in(names[key])
+            due = now if expires_in is None else now + expires_in - self.lead_time
+            heapq.heappush(queue, (due, -count, key))
+
+        refreshed = 0
+        while queue and queue[0][0] <= self._clock():
+            due, _, key = heapq.heappop(queue)
+            lag = max(0.0, self._clock() - due)
+            try:
+                ok = self._refresh(names[key])
+            except Exception as e:
+                logger.warning(f"Prefetch of {names[key]!r} failed: {e}")
+                ok = False
+            with self._lock:
+                if ok:
+                    refreshed += 1
+                    self._stats['refreshed'] += 1
+                    self._stats['last_refresh_lag'] = lag
+                    self._stats['max_refresh_lag'] = max(self._stats['max_refresh_lag'], lag)
+                else:
+                    self._stats['refresh_failures'] += 1
+
+        with self._lock:
+            self._queue = queue
+            self._stats['cycles'] += 1
+            self._decay_counts()
+        return refreshed
+
+    def start(self):
+        """Run the scheduler in a daemon thread of this process"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='weather-prefetch', daemon=True)
+        self._thread.start()
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Weather prefetch cycle failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        """Queue depth, refresh lag and counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._queue)
+            stats['next_due_in'] = round(self._queue[0][0] - self._clock(), 1) if self._queue else None
+            stats['tracked_cities'] = len(self._counts)
+            stats['top_cities'] = [self._names[key] for key, _ in self._counts.most_common(self.top_k)]
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+    def _decay_counts(self):
+        for key in list(self._counts):
+            self._counts[key] *= self.decay
+        if len(self._counts) > self.max_tracked:
+            keep = dict(self._counts.most_common(self.max_tracked))
+            for key in list(self._counts):
+                if key not in keep:
+                    del self._counts[key]
+                    self._names.pop(key, None)
+
+
+def _normalize(city):
+    return ' '.join(str(city).split()).lower()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def create_prefetch_scheduler(refresh=None):
+    """Build a prefetch scheduler for WeatherService from settings
+
+    ``refresh`` replaces WeatherService.refresh_current_weather as the
+    callable(city) -> bool run for every due city.
+    """
+    from django.conf import settings
+    from .models import WeatherService
+
+    return PrefetchScheduler(
+        refresh=refresh or WeatherService.refresh_current_weather,
+        expires_in=WeatherService.get_cache_expires_in,
+        top_k=getattr(settings, 'WEATHER_PREFETCH_TOP_K', 20),
+        lead_time=getattr(settings, 'WEATHER_PREFETCH_LEAD_TIME', 60),
+        interval=getattr(settings, 'WEATHER_PREFETCH_INTERVAL', 15),
+    )
+
+
+def get_prefetch_scheduler():
+    """Get the process-wide prefetch scheduler for WeatherService"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = create_prefetch_scheduler()
+    return _scheduler
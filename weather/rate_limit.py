@@ -0,0 +1,144 @@
+"""
+Client-side rate limiting and daily budget for the shared weather API key
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process bucket
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherAPIRateLimiter:
+    """Token bucket plus daily budget, shared by every worker on the host.
+
+    The bucket state lives in a small JSON file guarded by ``flock`` so that
+    all gunicorn/uvicorn workers draw from the same allowance for the single
+    API key. Without ``fcntl`` (or without a state file) the bucket is kept
+    in memory and only limits the current process.
+    """
+
+    def __init__(self, rate_per_minute=60, burst=10, daily_budget=0, state_file=None, clock=time.time):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.daily_budget = daily_budget
+        self.state_file = state_file if fcntl is not None else None
+        self._clock = clock  # wall clock: the state file is shared between processes
+        self._state = {}
+        self._lock = threading.Lock()
+        self._stats = {'granted': 0, 'denied': 0, 'throttled_by_provider': 0}
+
+    def acquire(self):
+        """Take one request from the budget; return False if it is exhausted"""
+        with self._locked_state() as state:
+            now = self._clock()
+            self._refill(state, now)
+
+            if now < state['blocked_until'] or state['tokens'] < 1 or (
+                self.daily_budget and state['day_used'] >= self.daily_budget
+            ):
+                granted = False
+            else:
+                state['tokens'] -= 1
+                state['day_used'] += 1
+                granted = True
+
+        with self._lock:
+            self._stats['granted' if granted else 'denied'] += 1
+        return granted
+
+    def penalize(self, retry_after=60):
+        """Stop all workers from calling the API after the provider returned 429"""
+        with self._locked_state() as state:
+            now = self._clock()
+            self._refill(state, now)
+            state['tokens'] = 0
+            state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+        with self._lock:
+            self._stats['throttled_by_provider'] += 1
+        logger.warning(f"Weather API rate limited by provider, backing off for {retry_after}s")
+
+    def stats(self):
+        """Quota consumption for monitoring"""
+        with self._locked_state() as state:
+            now = self._clock()
+            self._refill(state, now)
+            snapshot = dict(state)
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'tokens_available': round(snapshot['tokens'], 2),
+            'capacity': self.capacity,
+            'rate_per_minute': round(self.rate * 60, 2),
+            'daily_used': snapshot['day_used'],
+            'daily_budget': self.daily_budget or None,
+            'blocked_for': max(0, round(snapshot['blocked_until'] - now, 1)),
+            'shared': self.state_file is not None,
+        })
+        return stats
+
+    def _refill(self, state, now):
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        if not state:
+            state.update(tokens=float(self.capacity), updated=now, day=today, day_used=0, blocked_until=0)
+        state['tokens'] = min(self.capacity, state['tokens'] + max(0, now - state['updated']) * self.rate)
+        state['updated'] = now
+        if state['day'] != today:
+            state['day'] = today
+            state['day_used'] = 0
+
+    @contextmanager
+    def _locked_state(self):
+        with self._lock:
+            if self.state_file is None:
+                yield self._state
+                return
+
+            fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'r+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else {}
+                    except ValueError:
+                        state = {}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Get the weather API rate limiter configured from settings"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                from django.conf import settings
+                _limiter = WeatherAPIRateLimiter(
+                    rate_per_minute=getattr(settings, 'WEATHER_API_RATE_LIMIT_PER_MINUTE', 60),
+                    burst=getattr(settings, 'WEATHER_API_RATE_LIMIT_BURST', 10),
+                    daily_budget=getattr(settings, 'WEATHER_API_DAILY_BUDGET', 0),
+                    state_file=getattr(
+                        settings, 'WEATHER_API_RATE_LIMIT_FILE',
+                        os.path.join(tempfile.gettempdir(), 'weather_api_rate_limit.json')
+                    ),
+                )
+    return _limiter
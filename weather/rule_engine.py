@@ -0,0 +1,166 @@
+"""
+Compile recommendation rules written as data into decision tables
+"""
+from bisect import bisect_left, bisect_right
+from itertools import product
+
+# Numeric comparisons, applied to the sign of (value - threshold)
+NUMERIC_OPS = {
+    '>': lambda sign: sign > 0,
+    '>=': lambda sign: sign >= 0,
+    '<': lambda sign: sign < 0,
+    '<=': lambda sign: sign <= 0,
+    '==': lambda sign: sign == 0,
+}
+
+# Non-numeric tests, evaluated once per call into boolean flags
+FLAG_OPS = {
+    'contains': lambda value, operand: operand in value,                        # substring of a string
+    'includes_any': lambda value, operand: not value.isdisjoint(operand),       # set shares a member
+}
+
+
+class CompiledRules:
+    """A list of elif chains compiled into lookup tables.
+
+    Each chain is a list of ``{'when': [[atom, ...], ...], 'then': output}``
+    rules: ``when`` is in disjunctive normal form (any clause whose atoms
+    all hold) and the first matching rule of a chain produces its output,
+    like an ``if/elif`` ladder. An atom is ``(parameter, op, operand)``.
+
+    Every numeric parameter is reduced to a region index
+    ``bisect_left(thresholds, value) + bisect_right(thresholds, value)`` over
+    the sorted thresholds its atoms use. Even regions lie strictly between
+    two thresholds and odd regions sit exactly on one, so every comparison
+    has a fixed outcome per region. Each chain then gets a table indexed by
+    the regions and flags it reads, holding the output of its first
+    matching rule. When the product of all regions and flags is at most
+    ``max_table_size`` the chains are further folded into one table for the
+    whole rule set, so evaluation is a single lookup; larger rule sets look
+    up each chain's table in turn.
+    """
+
+    def __init__(self, chains, max_table_size=65536):
+        thresholds = {}
+        flags = []
+        for chain in chains:
+            for rule in chain:
+                for clause in rule['when']:
+                    for parameter, op, operand in clause:
+                        if op in NUMERIC_OPS:
+                            thresholds.setdefault(parameter, set()).add(operand)
+                        elif op in FLAG_OPS:
+                            if (parameter, op, operand) not in flags:
+                                flags.append((parameter, op, operand))
+                        else:
+                            raise ValueError(f"Unknown rule operator {op!r}")
+
+        self.parameters = [(parameter, tuple(sorted(values))) for parameter, values in thresholds.items()]
+        self.flags = flags
+        self._positions = {parameter: i for i, (parameter, _) in enumerate(self.parameters)}
+        self._tables = [self._compile_chain(chain) for chain in chains]
+
+        sizes = [self._size(variable) for variable in range(len(self.parameters) + len(self.flags))]
+        strides = _strides(sizes)
+        self._numeric = [(parameter, values, stride)
+                         for (parameter, values), stride in zip(self.parameters, strides)]
+        self._flag_tests = [(parameter, FLAG_OPS[op], operand, stride)
+                            for (parameter, op, operand), stride in zip(self.flags, strides[len(self.parameters):])]
+        self._table = None
+        if _product(sizes) <= max_table_size:
+            self._table = [self.evaluate_state(state) for state in product(*(range(size) for size in sizes))]
+
+    def state(self, inputs):
+        """Region of every numeric parameter followed by every flag, for ``inputs``"""
+        state = [bisect_left(values, inputs[parameter]) + bisect_right(values, inputs[parameter])
+                 for parameter, values in self.parameters]
+        state.extend(int(FLAG_OPS[op](inputs[parameter], operand)) for parameter, op, operand in self.flags)
+        return state
+
+    def index(self, inputs):
+        """Position of ``inputs`` in the combined table (the state in mixed radix)"""
+        index = 0
+        for parameter, values, stride in self._numeric:
+            value = inputs[parameter]
+            index += (bisect_left(values, value) + bisect_right(values, value)) * stride
+        for parameter, test, operand, stride in self._flag_tests:
+            if test(inputs[parameter], operand):
+                index += stride
+        return index
+
+    def evaluate(self, inputs):
+        """Outputs of every chain that matches ``inputs``, in chain order (shared, do not mutate)"""
+        if self._table is not None:
+            return self._table[self.index(inputs)]
+        return self.evaluate_state(self.state(inputs))
+
+    def evaluate_state(self, state):
+        """Outputs for an already computed ``state``, as a tuple"""
+        outputs = []
+        for variables, strides, table in self._tables:
+            output = table[sum(state[variable] * stride for variable, stride in zip(variables, strides))]
+            if output is not None:
+                outputs.append(output)
+        return tuple(outputs)
+
+    def _compile_chain(self, chain):
+        variables = sorted({
+            self._variable(parameter, op, operand)
+            for rule in chain for clause in rule['when'] for parameter, op, operand in clause
+        })
+        sizes = [self._size(variable) for variable in variables]
+        strides = _strides(sizes)
+
+        table = []
+        for combination in product(*(range(size) for size in sizes)):
+            state = dict(zip(variables, combination))
+            table.append(next(
+                (rule['then'] for rule in chain if any(
+                    all(self._holds(atom, state) for atom in clause) for clause in rule['when']
+                )),
+                None
+            ))
+        return variables, strides, table
+
+    def _variable(self, parameter, op, operand):
+        if op in NUMERIC_OPS:
+            return self._positions[parameter]
+        return len(self.parameters) + self.flags.index((parameter, op, operand))
+
+    def _size(self, variable):
+        if variable < len(self.parameters):
+            return 2 * len(self.parameters[variable][1]) + 1
+        return 2
+
+    def _holds(self, atom, state):
+        parameter, op, operand = atom
+        variable = self._variable(parameter, op, operand)
+        if op in FLAG_OPS:
+            return bool(state[variable])
+
+        values = self.parameters[variable][1]
+        region = state[variable]
+        index, on_threshold = divmod(region, 2)
+        if on_threshold:
+            sign = (values[index] > operand) - (values[index] < operand)
+        else:
+            # Strictly between values[index - 1] and values[index]
+            sign = 1 if index > values.index(operand) else -1
+        return NUMERIC_OPS[op](sign)
+
+
+def _strides(sizes):
+    """Mixed-radix place values for ``sizes`` (last variable varies fastest, matching itertools.product)"""
+    strides = []
+    stride = 1
+    for size in reversed(sizes):
+        strides.insert(0, stride)
+        stride *= size
+    return strides
+
+
+def _product(sizes):
+    total = 1
+    for size in sizes:
+        total *= size
+    return total
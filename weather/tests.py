@@ -1,3 +1,957 @@
-from django.test import TestCase
+import asyncio
+from datetime import datetime, timedelta
+from itertools import product
+import os
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from pymongo.errors import AutoReconnect
+
+from .cache import AsyncSingleFlight, SingleFlight, TTLCache
+from .circuit_breaker import CircuitBreaker
+from .enhanced_recommendations import PRIORITY_ORDER, EnhancedRecommendationEngine, _merge_by_priority
+from .health_recommendations import HealthRecommendationEngine
+from .indian_climate_recommendations import IndianClimateRecommendations, np
+from . import models, timeseries
+from .models import WeatherService
+from .prefetch import PrefetchScheduler
+from .rate_limit import WeatherAPIRateLimiter, fcntl
+from .weather_client import OpenWeatherClient, WeatherAPIRateLimited, _raise_for_status
+from .write_buffer import WriteBehindBuffer
+from weather_health_app import async_mongodb
+from weather_health_app.mongodb import mongodb
+
+
+def _legacy_recommendations(weather_data, user_role, health_conditions=None):
+    """(title, icon) of every recommendation the if/elif rules produced before they became data"""
+    temp = weather_data.get('temperature', 20)
+    humidity = weather_data.get('humidity', 50)
+    uv_index = weather_data.get('uv_index', 5)
+    air_quality = weather_data.get('air_quality_index', 3)
+    pollen = weather_data.get('pollen_count', 3)
+    description = weather_data.get('description', '').lower()
+    conditions = [c.strip().lower() for c in health_conditions.split(',')] if health_conditions else []
+    recommendations = []
+
+    if user_role == 'athlete':
+        if temp > 30:
+            recommendations.append(('High Temperature Alert', '🌡️'))
+        elif temp < 5:
+            recommendations.append(('Cold Weather Training', '❄️'))
+        if humidity > 80:
+            recommendations.append(('High Humidity', '💧'))
+        if uv_index > 7:
+            recommendations.append(('High UV Exposure', '☀️'))
+        if air_quality > 3:
+            recommendations.append(('Poor Air Quality', '😷'))
+        if pollen > 3:
+            recommendations.append(('High Pollen Count', '🌸'))
+    elif user_role == 'patient':
+        if any(c in ['asthma', 'copd', 'respiratory'] for c in conditions):
+            if air_quality > 2:
+                recommendations.append(('Respiratory Alert', '🫁'))
+            if pollen > 3:
+                recommendations.append(('High Pollen Alert', '🌿'))
+        if any(c in ['arthritis', 'joint pain'] for c in conditions):
+            if temp < 10 or humidity > 70:
+                recommendations.append(('Joint Care Reminder', '🦴'))
+        if 'diabetes' in conditions and temp > 28:
+            recommendations.append(('Diabetes Heat Alert', '🩸'))
+    elif user_role == 'elderly':
+        if temp > 32:
+            recommendations.append(('Heat Warning', '🌡️'))
+        elif temp < 2:
+            recommendations.append(('Cold Warning', '🧥'))
+        if 'rain' in description or 'snow' in description:
+            recommendations.append(('Slip Hazard Alert', '⚠️'))
+    elif user_role == 'doctor':
+        if temp > 30 or air_quality > 3:
+            recommendations.append(('Patient Care Alert', '🏥'))
+        if pollen > 3:
+            recommendations.append(('Allergy Season Alert', '💊'))
+    elif user_role == 'pharmacist':
+        if temp > 28:
+            recommendations.append(('Hot Weather Demand', '🧴'))
+        if pollen > 3:
+            recommendations.append(('Allergy Medication Alert', '💊'))
+        if 'rain' in description:
+            recommendations.append(('Cold & Flu Season', '🤧'))
+    else:
+        if temp > 25:
+            recommendations.append(('Stay Cool', '💧'))
+        if uv_index > 6:
+            recommendations.append(('UV Protection', '☀️'))
+
+    if air_quality > 4:
+        recommendations.append(('Air Quality Alert', '🏭'))
+    if temp > 26:
+        recommendations.append(('Energy Saving Tip', '💡'))
+    elif temp < 15:
+        recommendations.append(('Energy Saving Tip', '🏠'))
+    return recommendations
+
+
+class HealthRecommendationEngineTests(SimpleTestCase):
+    """The compiled rule tables must agree with the original if/elif rules"""
+
+    ROLES = ['athlete', 'patient', 'elderly', 'doctor', 'pharmacist', 'public', 'unknown', None]
+    CONDITIONS = [None, '', 'asthma', 'Asthma, Arthritis', 'joint pain,diabetes', 'COPD', 'respiratory , diabetes']
+
+    def test_matches_legacy_rules(self):
+        # Values on, just below and just above every threshold the rules use
+        temperatures = [-5, 2, 2.5, 5, 9, 10, 15, 25, 26, 28, 28.1, 30, 32, 33]
+        humidities = [50, 70, 70.5, 80, 81]
+        levels = [0, 2, 2.5, 3, 3.5, 4, 4.5, 6, 7, 7.5]
+        descriptions = ['clear sky', 'Light Rain', 'snow', '']
+        for temperature, humidity, level, pollen, description in product(
+                temperatures, humidities, levels, [3, 3.5], descriptions):
+            weather_data = {
+                'temperature': temperature,
+                'humidity': humidity,
+                'uv_index': level,
+                'air_quality_index': level,
+                'pollen_count': pollen,
+                'description': description,
+            }
+            for role in self.ROLES:
+                for conditions in (self.CONDITIONS if role == 'patient' else [None]):
+                    recommendations = HealthRecommendationEngine.get_recommendations(weather_data, role, conditions)
+                    self.assertEqual(
+                        [(r['title'], r['icon']) for r in recommendations],
+                        _legacy_recommendations(weather_data, role, conditions),
+                        (weather_data, role, conditions)
+                    )
+
+    def test_defaults_match_legacy_rules(self):
+        for role in self.ROLES:
+            recommendations = HealthRecommendationEngine.get_recommendations({}, role, 'asthma')
+            self.assertEqual([(r['title'], r['icon']) for r in recommendations],
+                             _legacy_recommendations({}, role, 'asthma'))
+
+    def test_results_are_independent_copies(self):
+        weather_data = {'temperature': 35, 'uv_index': 9}
+        first = HealthRecommendationEngine.get_recommendations(weather_data, 'public')
+        first[0]['title'] = 'Changed'
+        first.clear()
+        second = HealthRecommendationEngine.get_recommendations(weather_data, 'public')
+        self.assertEqual(second[0]['title'], 'Stay Cool')
+
+
+class ComprehensiveRecommendationCacheTests(SimpleTestCase):
+    """Memoized comprehensive recommendations must match freshly computed ones"""
+
+    BASE_WEATHER = {
+        'city': 'Delhi',
+        'temperature': 30,
+        'heat_index': 32,
+        'humidity': 60,
+        'pressure': 1013,
+        'description': 'clear sky',
+        'weather_condition': 'clear',
+        'wind_speed': 8,
+        'uv_index': 6,
+        'air_quality_index': 3,
+        'monsoon_intensity': 'none',
+        'dust_storm_risk': 'low',
+        'comfort_level': 'moderate',
+    }
+    # One change per weather field the engines read, each after the base snapshot
+    VARIATIONS = [
+        {},
+        {'pressure': 990},
+        {'temperature': 41, 'heat_index': 41},
+        {'heat_index': 45},
+        {'humidity': 90},
+        {'uv_index': 11},
+        {'air_quality_index': 5},
+        {'wind_speed': 30},
+        {'monsoon_intensity': 'heavy'},
+        {'dust_storm_risk': 'high'},
+        {'weather_condition': 'rain'},
+        {'comfort_level': 'very_hot'},
+        {'description': 'light rain'},
+    ]
+    PROFILES = [
+        ('patient', 'asthma,heart,diabetes,arthritis,migraine', frozenset()),
+        ('athlete', None, frozenset(['ac', 'window', 'curtains'])),
+        ('public', None, frozenset()),
+    ]
+
+    def setUp(self):
+        self.cache = EnhancedRecommendationEngine.get_recommendation_cache()
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+
+    def _recommend(self, weather_data, role, conditions, devices):
+        return EnhancedRecommendationEngine._get_recommendations_for(weather_data, role, conditions, devices, hour=10)
+
+    def test_cached_matches_uncached(self):
+        snapshots = [dict(self.BASE_WEATHER, **variation) for variation in self.VARIATIONS]
+        expected = {}
+        for index, weather_data in enumerate(snapshots):
+            for profile in self.PROFILES:
+                self.cache.clear()
+                expected[index, profile] = self._recommend(weather_data, *profile)
+
+        self.cache.clear()
+        for _ in range(2):
+            for index, weather_data in enumerate(snapshots):
+                for profile in self.PROFILES:
+                    self.assertEqual(self._recommend(weather_data, *profile), expected[index, profile],
+                                     (weather_data, profile))
+
+    def test_pressure_change_raises_migraine_alert(self):
+        self._recommend(self.BASE_WEATHER, 'patient', 'migraine', frozenset())
+        recommendations = self._recommend(dict(self.BASE_WEATHER, pressure=990), 'patient', 'migraine', frozenset())
+        self.assertIn('Migraine Weather Alert', [r['title'] for r in recommendations])
+
+    def test_results_do_not_modify_the_cache(self):
+        profile = ('athlete', None, frozenset(['ac']))
+        first = self._recommend(self.BASE_WEATHER, *profile)
+        expected = self._recommend(self.BASE_WEATHER, *profile)
+        for recommendation in first:
+            recommendation['title'] = 'Changed'
+            for value in recommendation.values():
+                if isinstance(value, list):
+                    value.clear()
+        self.assertEqual(self._recommend(self.BASE_WEATHER, *profile), expected)
+
+
+class PrefetchSchedulerTests(SimpleTestCase):
+
+    def test_record_tracks_at_most_max_tracked_cities(self):
+        scheduler = PrefetchScheduler(refresh=lambda city: True, expires_in=lambda city: None, max_tracked=3)
+        for _ in range(5):
+            scheduler.record('Delhi')
+            scheduler.record('Mumbai')
+        for index in range(100):
+            scheduler.record(f"City {index}")
+
+        stats = scheduler.stats()
+        self.assertEqual(stats['tracked_cities'], 3)
+        self.assertEqual(stats['top_cities'][:2], ['Delhi', 'Mumbai'])
+        self.assertIn('City 99', stats['top_cities'])
+
+
+class _FakeReadings:
+    """Stands in for the weather_data collection, recording find_one calls"""
+
+    def __init__(self, reading=None):
+        self.reading = reading
+        self.queries = []
+
+    def find_one(self, query, *args, **kwargs):
+        self.queries.append(query)
+        return self.reading
+
+
+@override_settings(WEATHER_USE_SAVED_READINGS=True)
+class SavedCurrentWeatherTests(SimpleTestCase):
+    """Cache misses only look for readings saved by other processes when that can pay off"""
+
+    def setUp(self):
+        self.readings = _FakeReadings({
+            'city': 'Pune', 'country': 'IN', 'temperature': 31, 'saved_at': datetime.now() - timedelta(seconds=30),
+        })
+        for patcher in (
+            mock.patch('weather.models.get_collection', return_value=self.readings),
+            mock.patch('weather.models.get_weather_client', return_value=SimpleNamespace(enabled=True)),
+            mock.patch.object(mongodb, '_healthy', True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_serves_fresh_saved_reading(self):
+        weather_data, age = WeatherService._get_saved_current_weather('Pune', 600)
+        self.assertEqual(weather_data['temperature'], 31)
+        self.assertNotIn('saved_at', weather_data)
+        self.assertTrue(30 <= age < 600)
+
+    def test_skipped_without_api_key(self):
+        with mock.patch('weather.models.get_weather_client', return_value=SimpleNamespace(enabled=False)):
+            self.assertIsNone(WeatherService._get_saved_current_weather('Pune', 600))
+        self.assertEqual(self.readings.queries, [])
+
+    def test_skipped_unless_mongodb_is_known_healthy(self):
+        for healthy in (None, False):
+            with mock.patch.object(mongodb, '_healthy', healthy):
+                self.assertIsNone(WeatherService._get_saved_current_weather('Pune', 600))
+        self.assertEqual(self.readings.queries, [])
+
+    @override_settings(WEATHER_USE_SAVED_READINGS=False)
+    def test_disabled_by_setting(self):
+        self.assertIsNone(WeatherService._get_saved_current_weather('Pune', 600))
+        self.assertEqual(self.readings.queries, [])
+
+    def test_demo_mode_miss_goes_straight_to_demo_data(self):
+        with mock.patch('weather.models.get_weather_client', return_value=SimpleNamespace(enabled=False)):
+            weather_data = WeatherService.get_current_weather('Saved Readings Test City')
+        self.assertEqual(weather_data['country'], 'Demo')
+        self.assertEqual(self.readings.queries, [])
+
+
+class _FakeClock:
+    """Injectable clock that only moves when a test advances it"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class _FakeCollection:
+    """Collection whose next ``failures`` insert_many calls fail as if the server were down"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.documents = []
+
+    def insert_many(self, documents, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect('connection refused')
+        self.documents.extend(documents)
+
+
+class WriteBehindBufferTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.collection = _FakeCollection()
+
+    def _buffer(self, **options):
+        options.setdefault('batch_size', 3)
+        options.setdefault('flush_interval', 60)
+        return WriteBehindBuffer(lambda: self.collection, autostart=False, clock=self.clock, **options)
+
+    def test_flushes_when_batch_is_full(self):
+        buffer = self._buffer()
+        for index in range(3):
+            buffer.add({'n': index})
+        self.assertEqual([buffer.run_once(timeout=0) for _ in range(3)], [0, 0, 3])
+        self.assertEqual(self.collection.documents, [{'n': 0}, {'n': 1}, {'n': 2}])
+
+    def test_flushes_when_interval_has_passed(self):
+        buffer = self._buffer()
+        buffer.add({'n': 0})
+        self.assertEqual(buffer.run_once(timeout=0), 0)
+        self.clock.advance(59)
+        self.assertEqual(buffer.run_once(timeout=0), 0)
+        self.clock.advance(1)
+        self.assertEqual(buffer.run_once(timeout=0), 1)
+        self.assertEqual(buffer.stats()['written'], 1)
+
+    def test_failed_flush_is_retried_with_backoff(self):
+        self.collection.failures = 2
+        buffer = self._buffer(batch_size=2, retry_backoff=1)
+        buffer.add({'n': 0})
+        buffer.add({'n': 1})
+        buffer.run_once(timeout=0)
+        buffer.run_once(timeout=0)
+        self.assertEqual(buffer.stats()['retry_pending'], 2)
+
+        self.assertEqual(buffer.run_once(timeout=0), 0)  # backoff not over yet
+        self.clock.advance(1)
+        self.assertEqual(buffer.run_once(timeout=0), 0)  # second attempt fails, backoff doubles
+        self.clock.advance(1)
+        self.assertEqual(buffer.run_once(timeout=0), 0)
+        self.clock.advance(1)
+        self.assertEqual(buffer.run_once(timeout=0), 2)
+
+        stats = buffer.stats()
+        self.assertEqual(self.collection.documents, [{'n': 0}, {'n': 1}])
+        self.assertEqual((stats['written'], stats['failed'], stats['retried'], stats['lost']), (2, 4, 4, 0))
+        self.assertEqual(stats['retry_pending'], 0)
+
+    def test_gives_up_after_max_retries(self):
+        self.collection.failures = 3
+        buffer = self._buffer(batch_size=1, max_retries=2, retry_backoff=1)
+        buffer.add({'n': 0})
+        buffer.run_once(timeout=0)
+        for _ in range(2):
+            self.clock.advance(10)
+            buffer.run_once(timeout=0)
+
+        stats = buffer.stats()
+        self.assertEqual((stats['lost'], stats['retry_pending']), (1, 0))
+        self.assertEqual(self.collection.documents, [])
+
+    def test_stop_writes_held_queued_and_failed_documents(self):
+        self.collection.failures = 1
+        buffer = self._buffer(batch_size=2)
+        buffer.add({'n': 0})
+        buffer.add({'n': 1})
+        buffer.run_once(timeout=0)
+        buffer.run_once(timeout=0)  # fails, waiting for a retry
+        buffer.add({'n': 2})
+        buffer.run_once(timeout=0)  # held in the next batch
+        buffer.add({'n': 3})        # still queued
+
+        buffer.stop()
+        self.assertCountEqual(self.collection.documents, [{'n': 0}, {'n': 1}, {'n': 2}, {'n': 3}])
+        self.assertEqual(buffer.stats()['lost'], 0)
+
+    def test_stop_flushes_documents_added_to_running_flusher(self):
+        buffer = WriteBehindBuffer(lambda: self.collection, batch_size=100, flush_interval=0.05)
+        for index in range(5):
+            self.assertTrue(buffer.add({'n': index}))
+
+        buffer.stop()
+        self.assertEqual(self.collection.documents, [{'n': index} for index in range(5)])
+        self.assertEqual(buffer.stats()['pending'], 0)
+
+
+def _wait_for(predicate, timeout=5):
+    """Wait for work finishing on another thread; fail the test if it never does"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for a background thread")
+        time.sleep(0.001)
+
+
+class TTLCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.cache = TTLCache(ttl=60, stale_ttl=120, max_entries=2, clock=self.clock)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertIsNone(self.cache.peek('b'))
+        self.assertEqual((self.cache.get('a'), self.cache.get('c')), (1, 3))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_fresh_stale_and_expired_entries(self):
+        self.cache.set('a', 1)
+        self.clock.advance(59)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.clock.advance(1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.clock.advance(120)
+        self.assertIsNone(self.cache.get('a'))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['stale_hits'], stats['misses']), (1, 1, 1))
+
+    def test_backdated_entry_expires_early(self):
+        self.cache.set('a', 1, age=50)
+        self.assertEqual(self.cache.expires_in('a'), 10)
+
+    def test_stale_hits_start_one_refresh(self):
+        calls = []
+        release = threading.Event()
+
+        def refresh():
+            calls.append(1)
+            release.wait(5)
+            return 2
+
+        self.cache.set('a', 1)
+        self.clock.advance(90)
+        for _ in range(5):
+            self.assertEqual(self.cache.get('a', refresh=refresh), 1)
+        _wait_for(lambda: calls)
+        self.assertEqual(self.cache.stats()['refreshing'], 1)
+
+        release.set()
+        _wait_for(lambda: self.cache.stats()['refreshing'] == 0)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get('a', refresh=refresh), 2)
+        self.assertEqual(self.cache.stats()['refreshes'], 1)
+
+    def test_failed_refresh_keeps_serving_stale_value(self):
+        self.cache.set('a', 1)
+        self.clock.advance(90)
+        self.assertEqual(self.cache.get('a', refresh=lambda: None), 1)
+        _wait_for(lambda: self.cache.stats()['refresh_failures'] == 1)
+        self.assertEqual(self.cache.get('a'), 1)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Concurrent callers for one key share a single upstream call"""
+
+    CALLERS = 8
+
+    def _run_concurrently(self, call):
+        results = [None] * self.CALLERS
+        errors = [None] * self.CALLERS
+
+        def run(index):
+            try:
+                results[index] = call()
+            except Exception as e:
+                errors[index] = e
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(self.CALLERS)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'temperature': 20}
+
+        threads, results, errors = self._run_concurrently(lambda: flights.do('delhi', fetch))
+        _wait_for(lambda: flights.stats()['shared'] == self.CALLERS - 1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [None] * self.CALLERS)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flights.stats()['in_flight'], 0)
+
+    def test_error_is_raised_to_every_caller(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(5)
+            raise RuntimeError('upstream down')
+
+        threads, results, errors = self._run_concurrently(lambda: flights.do('delhi', fetch))
+        _wait_for(lambda: flights.stats()['shared'] == self.CALLERS - 1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertTrue(all(isinstance(error, RuntimeError) for error in errors))
+        self.assertEqual(flights.stats()['calls'], 1)
+
+    def test_async_callers_share_one_call(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'temperature': 20}
+
+        async def main():
+            return await asyncio.gather(*(flights.do('delhi', fetch) for _ in range(self.CALLERS)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_concurrent_cache_misses_fetch_once(self):
+        city = 'Single Flight Test City'
+        self.addCleanup(WeatherService.get_cache().invalidate, WeatherService._cache_key(city))
+        calls = []
+        release = threading.Event()
+        shared_before = models._weather_flights.stats()['shared']
+
+        def fetch_current_weather(query):
+            calls.append(query)
+            release.wait(5)
+            return {'city': city, 'country': 'IN', 'temperature': 25}
+
+        with mock.patch.object(WeatherService, '_fetch_current_weather', side_effect=fetch_current_weather):
+            threads, results, errors = self._run_concurrently(lambda: WeatherService.get_current_weather(city))
+            _wait_for(lambda: models._weather_flights.stats()['shared'] - shared_before == self.CALLERS - 1)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(calls, [{'q': city}])
+        self.assertEqual(errors, [None] * self.CALLERS)
+        self.assertTrue(all(result['temperature'] == 25 for result in results))
+
+
+class WeatherAPIRateLimiterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = _FakeClock()
+
+    def _limiter(self, **options):
+        options.setdefault('rate_per_minute', 60)
+        options.setdefault('burst', 3)
+        return WeatherAPIRateLimiter(clock=self.clock, **options)
+
+    def test_burst_then_block_then_refill(self):
+        limiter = self._limiter()
+        self.assertEqual([limiter.acquire() for _ in range(4)], [True, True, True, False])
+
+        self.clock.advance(1)
+        self.assertEqual([limiter.acquire() for _ in range(2)], [True, False])
+
+        # Refill is capped at the burst size
+        self.clock.advance(600)
+        self.assertEqual([limiter.acquire() for _ in range(4)], [True, True, True, False])
+
+        stats = limiter.stats()
+        self.assertEqual((stats['granted'], stats['denied']), (7, 3))
+
+    def test_daily_budget(self):
+        limiter = self._limiter(daily_budget=2)
+        self.assertEqual([limiter.acquire() for _ in range(3)], [True, True, False])
+        self.clock.advance(60)
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.stats()['daily_used'], 2)
+
+    def test_provider_429_blocks_until_retry_after(self):
+        limiter = self._limiter()
+        response = SimpleNamespace(status_code=429, headers={'Retry-After': '30'})
+        with self.assertRaises(WeatherAPIRateLimited):
+            _raise_for_status('weather', response, limiter)
+
+        self.clock.advance(29)
+        self.assertFalse(limiter.acquire())
+        self.clock.advance(1)
+        self.assertTrue(limiter.acquire())
+        self.assertEqual(limiter.stats()['throttled_by_provider'], 1)
+
+    @skipIf(fcntl is None, "the shared bucket needs fcntl")
+    def test_state_file_is_shared_between_limiters(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = os.path.join(directory, 'rate_limit.json')
+            first = self._limiter(burst=2, state_file=state_file)
+            second = self._limiter(burst=2, state_file=state_file)
+            self.assertEqual([first.acquire(), second.acquire(), first.acquire()], [True, True, False])
+            self.assertTrue(second.stats()['shared'])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.transitions = []
+        self.breaker = CircuitBreaker('test', failure_threshold=3, recovery_timeout=30, clock=self.clock)
+        self.breaker.add_listener(lambda name, old, new: self.transitions.append((old, new)))
+
+    def _open(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    def test_half_open_trial_success_closes(self):
+        self._open()
+        self.clock.advance(29)
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.advance(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())  # one trial call at a time
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.transitions, [('closed', 'open'), ('open', 'half_open'), ('half_open', 'closed')])
+
+    def test_half_open_trial_failure_reopens(self):
+        self._open()
+        self.clock.advance(30)
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()['retry_in'], 30)
+
+    def test_released_trial_slot_can_be_reused(self):
+        self._open()
+        self.clock.advance(30)
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow_request())
+
+
+class StaleWeatherFallbackTests(SimpleTestCase):
+    """With the circuit open, lookups serve the last reading flagged as stale"""
+
+    CITY = 'Circuit Breaker Test City'
+
+    def setUp(self):
+        self.cache = WeatherService.get_cache()
+        self.key = WeatherService._cache_key(self.CITY)
+        self.addCleanup(self.cache.invalidate, self.key)
+
+        breaker = CircuitBreaker('test', failure_threshold=1)
+        breaker.record_failure()
+        client = OpenWeatherClient('test-key', 'http://127.0.0.1:9/data/2.5', circuit_breaker=breaker)
+        patcher = mock.patch('weather.models.get_weather_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_serves_last_cached_reading_flagged_stale(self):
+        expired = self.cache.ttl + self.cache.stale_ttl + 5
+        self.cache.set(self.key, {'city': self.CITY, 'country': 'IN', 'temperature': 33}, age=expired)
+
+        weather_data = WeatherService.get_current_weather(self.CITY)
+        self.assertEqual(weather_data['temperature'], 33)
+        self.assertTrue(weather_data['stale'])
+        self.assertEqual(weather_data['stale_reason'], 'circuit_open')
+        self.assertEqual(weather_data['data_age_seconds'], expired)
+        self.assertNotIn('stale', self.cache.peek(self.key)[0])
+
+    def test_falls_back_to_flagged_demo_data_without_a_cached_reading(self):
+        weather_data = WeatherService.get_current_weather(self.CITY)
+        self.assertEqual(weather_data['country'], 'Demo')
+        self.assertTrue(weather_data['stale'])
+        self.assertIsNone(weather_data['data_age_seconds'])
+
+
+class BatchRecommendationTests(SimpleTestCase):
+    """get_batch_recommendations must give every user what a per-user call gives them"""
+
+    ROLES = ['athlete', 'patient', 'elderly', 'doctor', 'pharmacist', 'public']
+    CONDITIONS = [None, '', 'Asthma', 'heart, Diabetes', 'eye,asthma', 'migraine']
+    DEVICES = [(), ('ac',), ['curtains', 'window'], frozenset(['ac', 'curtains', 'window'])]
+
+    def test_matches_per_user_loop(self):
+        rng = random.Random(23)
+        for temperature, humidity, air_quality in product((5, 31, 43), (50, 85), (3, 5)):
+            weather_data = dict(ComprehensiveRecommendationCacheTests.BASE_WEATHER, temperature=temperature,
+                                heat_index=temperature, humidity=humidity, air_quality_index=air_quality)
+            users = 200
+            roles = [rng.choice(self.ROLES) for _ in range(users)]
+            conditions = [rng.choice(self.CONDITIONS) for _ in range(users)]
+            devices = [rng.choice(self.DEVICES) for _ in range(users)]
+
+            groups = EnhancedRecommendationEngine.get_batch_recommendations(
+                weather_data, roles, conditions, devices, hour=15
+            )
+            self.assertEqual(sorted(user for group in groups for user in group['users']), list(range(users)))
+            self.assertEqual([group['users'][0] for group in groups],
+                             sorted(group['users'][0] for group in groups))
+            for group in groups:
+                for user in group['users']:
+                    expected = EnhancedRecommendationEngine._get_recommendations_for(
+                        weather_data, roles[user], conditions[user], frozenset(devices[user]), hour=15
+                    )
+                    self.assertEqual(group['recommendations'], expected, (weather_data, user))
+            outcomes = [repr(group['recommendations']) for group in groups]
+            self.assertEqual(len(set(outcomes)), len(outcomes))
+
+    def test_columns_must_have_equal_length(self):
+        with self.assertRaises(ValueError):
+            EnhancedRecommendationEngine.get_batch_recommendations({}, ['public', 'athlete'], [None])
+
+
+@skipIf(np is None, "trigger masks need numpy")
+class TriggerMaskTests(SimpleTestCase):
+    """Vectorized trigger masks must agree with the per-snapshot rule methods"""
+
+    ROLES = ['athlete', 'patient', 'elderly', 'doctor', 'pharmacist', 'public', None]
+    STEPS = 300
+
+    def _per_step_titles(self, weather_data, role):
+        methods = (
+            IndianClimateRecommendations.get_temperature_recommendations,
+            IndianClimateRecommendations.get_monsoon_recommendations,
+            IndianClimateRecommendations.get_air_quality_recommendations,
+            IndianClimateRecommendations.get_uv_recommendations,
+            IndianClimateRecommendations.get_role_specific_recommendations,
+        )
+        return [recommendation['title'] for method in methods for recommendation in method(weather_data, role)]
+
+    def test_matches_per_step_methods_for_every_role(self):
+        rng = np.random.default_rng(24)
+        for role in self.ROLES:
+            timeline = {
+                # Values on and around every threshold the rules use
+                'temperature': rng.choice([-3, 9, 10, 21.5, 22, 25, 30, 30.5, 35, 35.5, 40, 41], self.STEPS),
+                'humidity': rng.choice([50, 70, 71, 85, 86], self.STEPS),
+                'air_quality_index': rng.integers(1, 6, self.STEPS).astype(float),
+                'uv_index': rng.integers(0, 13, self.STEPS),
+                'monsoon_intensity': rng.choice(['none', 'heavy', 'moderate', 'pre_monsoon'], self.STEPS),
+                'dust_storm_risk': rng.choice(['low', 'moderate', 'high'], self.STEPS),
+            }
+            masks = IndianClimateRecommendations.get_trigger_masks(timeline, role)
+            for step in range(self.STEPS):
+                weather_data = {field: values[step].item() for field, values in timeline.items()}
+                self.assertEqual([title for title, mask in masks.items() if mask[step]],
+                                 self._per_step_titles(weather_data, role), (weather_data, role))
+
+    def test_missing_fields_take_per_step_defaults(self):
+        timeline = {'temperature': np.array([5.0, 25.0, 41.0])}
+        for role in self.ROLES:
+            masks = IndianClimateRecommendations.get_trigger_masks(timeline, role)
+            for step, temperature in enumerate(timeline['temperature']):
+                self.assertEqual([title for title, mask in masks.items() if mask[step]],
+                                 self._per_step_titles({'temperature': temperature.item()}, role))
+
+
+class MergeByPriorityTests(SimpleTestCase):
+    """The streaming dedupe-and-rank merge must match dedupe then a full stable sort"""
+
+    def _reference(self, recommendations):
+        seen_titles = set()
+        unique = []
+        for recommendation in recommendations:
+            if recommendation.get('title') not in seen_titles:
+                seen_titles.add(recommendation.get('title'))
+                unique.append(recommendation)
+        return sorted(unique, key=lambda rec: PRIORITY_ORDER.get(rec.get('priority', 'low'), 3))
+
+    def test_matches_dedupe_and_full_sort(self):
+        rng = random.Random(25)
+        priorities = ['critical', 'high', 'medium', 'low', 'unknown', None]
+        for _ in range(300):
+            recommendations = []
+            for index in range(rng.randint(0, 30)):
+                recommendation = {'title': f"T{rng.randint(0, 15)}", 'n': index}
+                priority = rng.choice(priorities)
+                if priority is not None:
+                    recommendation['priority'] = priority
+                recommendations.append(recommendation)
+
+            full = _merge_by_priority(iter(recommendations))
+            self.assertEqual(full, self._reference(recommendations))
+            for limit in range(0, len(full) + 2):
+                self.assertEqual(_merge_by_priority(iter(recommendations), limit), full[:limit])
+
+    def test_limit_returns_head_of_full_result(self):
+        weather_data = dict(ComprehensiveRecommendationCacheTests.BASE_WEATHER, temperature=41, heat_index=45,
+                            air_quality_index=5, dust_storm_risk='high')
+        devices = frozenset(['ac', 'window', 'curtains'])
+        for role in BatchRecommendationTests.ROLES:
+            full = EnhancedRecommendationEngine._get_recommendations_for(
+                weather_data, role, 'asthma,heart,diabetes', devices, hour=15
+            )
+            for limit in (1, 3, 5, len(full) + 1):
+                self.assertEqual(EnhancedRecommendationEngine._get_recommendations_for(
+                    weather_data, role, 'asthma,heart,diabetes', devices, hour=15, limit=limit
+                ), full[:limit])
+
+    def test_batch_limit_applies_per_group(self):
+        weather_data = ComprehensiveRecommendationCacheTests.BASE_WEATHER
+        roles = BatchRecommendationTests.ROLES
+        groups = EnhancedRecommendationEngine.get_batch_recommendations(weather_data, roles, limit=2, hour=15)
+        for group in groups:
+            full = EnhancedRecommendationEngine._get_recommendations_for(
+                weather_data, roles[group['users'][0]], None, frozenset(), hour=15
+            )
+            self.assertEqual(group['recommendations'], full[:2])
+
+
+class _FakeDatabase:
+    """Records collection setup calls; ``collections`` maps name -> listCollections type"""
+
+    def __init__(self, **collections):
+        self.collections = collections
+        self.calls = []
+        self.inserted = []
+
+    def list_collections(self, filter=None):
+        self.calls.append('list_collections')
+        name = filter['name']
+        if name in self.collections:
+            yield {'name': name, 'type': self.collections[name]}
+
+    def create_collection(self, name, **options):
+        self.calls.append(('create_collection', name, options))
+        self.collections[name] = 'timeseries' if 'timeseries' in options else 'collection'
+
+    def command(self, *args, **kwargs):
+        self.calls.append(('command',) + args)
+
+    def insert_one(self, document):
+        self.inserted.append(document)
+
+
+@override_settings(WEATHER_STORAGE_MODE='timeseries', WEATHER_TIMESERIES_COLLECTION='weather_readings',
+                   WEATHER_WRITE_BUFFER_ENABLED=False)
+class TimeseriesCollectionTests(SimpleTestCase):
+    """Readings are never written before the time-series collection is set up"""
+
+    def setUp(self):
+        patcher = mock.patch.object(timeseries, '_readings_collection_ready', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_creates_missing_collection(self):
+        db = _FakeDatabase()
+        self.assertEqual(timeseries.ensure_timeseries_collection(db), 'weather_readings')
+        _, name, options = db.calls[-1]
+        self.assertEqual(name, 'weather_readings')
+        self.assertEqual(options['timeseries']['timeField'], 'saved_at')
+
+    def test_updates_expiry_of_existing_collection(self):
+        db = _FakeDatabase(weather_readings='timeseries')
+        timeseries.ensure_timeseries_collection(db)
+        self.assertEqual(db.calls[-1], ('command', 'collMod', 'weather_readings'))
+
+    def test_rejects_existing_plain_collection(self):
+        db = _FakeDatabase(weather_readings='collection')
+        with self.assertRaises(ImproperlyConfigured):
+            timeseries.ensure_timeseries_collection(db)
+        self.assertEqual(db.calls, ['list_collections'])
+
+    def test_readings_collection_is_checked_once(self):
+        db = _FakeDatabase()
+        self.assertTrue(timeseries.ensure_readings_collection(db))
+        self.assertTrue(timeseries.ensure_readings_collection(db))
+        self.assertEqual(db.calls.count('list_collections'), 1)
+
+    @override_settings(WEATHER_STORAGE_MODE='documents')
+    def test_documents_mode_needs_no_setup(self):
+        db = _FakeDatabase()
+        self.assertTrue(timeseries.ensure_readings_collection(db))
+        self.assertEqual(db.calls, [])
+
+    def test_first_write_sets_up_collection(self):
+        db = _FakeDatabase()
+        with mock.patch('weather.models.get_collection', return_value=db), \
+                mock.patch('weather_health_app.mongodb.get_db', return_value=db):
+            self.assertTrue(WeatherService._insert_weather({'city': 'Pune', 'country': 'IN', 'temperature': 30}))
+        self.assertEqual(db.collections, {'weather_readings': 'timeseries'})
+        self.assertEqual(db.inserted[0]['meta'], {'city': 'Pune', 'country': 'IN'})
+
+    def test_write_refused_into_plain_collection(self):
+        db = _FakeDatabase(weather_readings='collection')
+        with mock.patch('weather.models.get_collection', return_value=db), \
+                mock.patch('weather_health_app.mongodb.get_db', return_value=db):
+            self.assertFalse(WeatherService._insert_weather({'city': 'Pune', 'temperature': 30}))
+        self.assertEqual(db.inserted, [])
+
+
+@skipIf(async_mongodb.AsyncIOMotorClient is None, "needs motor")
+class AsyncMongoDBTests(SimpleTestCase):
+
+    def test_async_client_starts_health_probe(self):
+        async def connect():
+            return async_mongodb.get_async_client()
+
+        with mock.patch.object(mongodb, 'ensure_health_probe') as ensure_health_probe:
+            client = asyncio.run(connect())
+        self.addCleanup(client.close)
+        ensure_health_probe.assert_called_once_with()
+
+    def test_collection_is_withheld_while_mongodb_is_down(self):
+        async def collection():
+            return async_mongodb.get_async_collection('weather_data')
+
+        with mock.patch.object(mongodb, 'ensure_health_probe'), mock.patch.object(mongodb, '_healthy', False):
+            self.assertIsNone(asyncio.run(collection()))
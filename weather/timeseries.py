@@ -0,0 +1,210 @@
+"""
+Time-series storage mode for weather readings and their daily rollups
+"""
+from datetime import datetime, timedelta
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTS = 'documents'
+TIMESERIES = 'timeseries'
+
+# Fields kept together as the time-series metaField; readings are bucketed per meta value
+META_FIELDS = ('city', 'country')
+COORDINATE_FIELDS = ('lat', 'lon')
+
+# Numeric measurements averaged (and bounded) in the daily rollup
+ROLLUP_FIELDS = ('temperature', 'feels_like', 'humidity', 'pressure', 'wind_speed', 'uv_index', 'air_quality_index')
+
+_readings_collection_ready = False
+_readings_collection_lock = threading.Lock()
+
+
+def storage_mode():
+    """'documents' (plain weather_data collection) or 'timeseries'"""
+    return getattr(settings, 'WEATHER_STORAGE_MODE', DOCUMENTS)
+
+
+def is_timeseries():
+    return storage_mode() == TIMESERIES
+
+
+def readings_collection_name():
+    """Collection weather readings are written to and read from in the current mode"""
+    if is_timeseries():
+        return getattr(settings, 'WEATHER_TIMESERIES_COLLECTION', 'weather_readings')
+    return 'weather_data'
+
+
+def rollup_collection_name():
+    return getattr(settings, 'WEATHER_ROLLUP_COLLECTION', 'weather_daily')
+
+
+def city_field():
+    """Field holding the city name in stored readings"""
+    return 'meta.city' if is_timeseries() else 'city'
+
+
+def to_storage_document(document):
+    """Shape a formatted reading for the current storage mode (returns a new dict)"""
+    if not is_timeseries():
+        return dict(document)
+    stored = {key: value for key, value in document.items()
+              if key not in META_FIELDS and key not in COORDINATE_FIELDS}
+    meta = {key: document.get(key) for key in META_FIELDS}
+    if all(document.get(key) is not None for key in COORDINATE_FIELDS):
+        meta['coords'] = {key: document[key] for key in COORDINATE_FIELDS}
+    stored['meta'] = meta
+    return stored
+
+
+def from_storage_document(document):
+    """Flatten a stored reading back into the shape WeatherService returns"""
+    if document is None or 'meta' not in document:
+        return document
+    flat = {key: value for key, value in document.items() if key != 'meta'}
+    meta = document['meta'] or {}
+    flat.update((key, meta[key]) for key in META_FIELDS if key in meta)
+    if meta.get('coords'):
+        flat.update(meta['coords'])
+    return flat
+
+
+def projection(fields):
+    """Mongo projection returning only ``fields`` (named as in the flattened reading), without _id"""
+    if not fields:
+        return None
+    projected = {'_id': 0}
+    for field in fields:
+        if is_timeseries() and field in META_FIELDS:
+            field = f"meta.{field}"
+        elif is_timeseries() and field in COORDINATE_FIELDS:
+            field = f"meta.coords.{field}"
+        projected[field] = 1
+    return projected
+
+
+def latest_per_day_pipeline(city, start, end, fields=None):
+    """Aggregation returning the last reading a city saved on each day in ``[start, end)``"""
+    pipeline = [
+        {'$match': {city_field(): city, 'saved_at': {'$gte': start, '$lt': end}}},
+        {'$sort': {'saved_at': 1}},
+    ]
+    if fields:
+        pipeline.append({'$project': projection(tuple(fields) + ('saved_at',))})
+    pipeline.append({'$group': {
+        '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$saved_at'}},
+        'reading': {'$last': '$$ROOT'},
+    }})
+    return pipeline
+
+
+def readings_by_day(results):
+    """Map the output of ``latest_per_day_pipeline`` to {'YYYY-MM-DD': reading}"""
+    return {result['_id']: from_storage_document(result['reading']) for result in results}
+
+
+def ensure_timeseries_collection(db=None):
+    """Create the time-series collection, or update its expiry; return its name or None if MongoDB is unavailable
+
+    Raises ImproperlyConfigured if a collection of that name exists but is
+    not a time-series collection (an insert before setup creates a plain one).
+    """
+    if db is None:
+        from weather_health_app.mongodb import get_db
+        db = get_db()
+    if db is None:
+        logger.error("Cannot create the weather time-series collection: MongoDB is unavailable")
+        return None
+
+    name = getattr(settings, 'WEATHER_TIMESERIES_COLLECTION', 'weather_readings')
+    expire_after = getattr(settings, 'WEATHER_TIMESERIES_EXPIRE_AFTER_SECONDS', 0)
+    existing = next(iter(db.list_collections(filter={'name': name})), None)
+    if existing is None:
+        options = {
+            'timeseries': {
+                'timeField': 'saved_at',
+                'metaField': 'meta',
+                'granularity': getattr(settings, 'WEATHER_TIMESERIES_GRANULARITY', 'minutes'),
+            },
+        }
+        if expire_after:
+            options['expireAfterSeconds'] = expire_after
+        db.create_collection(name, **options)
+        logger.info(f"Created time-series collection {name}")
+    elif existing.get('type') != 'timeseries':
+        raise ImproperlyConfigured(
+            f"{name} exists but is not a time-series collection; drop or rename it, "
+            f"or point WEATHER_TIMESERIES_COLLECTION elsewhere, before using WEATHER_STORAGE_MODE = 'timeseries'"
+        )
+    else:
+        db.command('collMod', name, expireAfterSeconds=expire_after or 'off')
+    return name
+
+
+def ensure_readings_collection(db=None):
+    """Make sure readings can be written; call before inserting into the readings collection
+
+    In time-series mode the first call creates the time-series collection
+    (or checks the existing one) with ensure_timeseries_collection, so a
+    write never creates a plain collection implicitly. Returns False while
+    MongoDB is unavailable, and the check is repeated on the next call.
+    """
+    global _readings_collection_ready
+    if _readings_collection_ready or not is_timeseries():
+        return True
+    with _readings_collection_lock:
+        if not _readings_collection_ready:
+            _readings_collection_ready = ensure_timeseries_collection(db) is not None
+    return _readings_collection_ready
+
+
+def rollup_daily(start=None, end=None, db=None):
+    """Downsample readings into one document per city and day with $merge
+
+    Days in ``[start, end)`` (defaults: yesterday and today) are recomputed
+    and replace any rollups already stored for them, so reruns are safe.
+    """
+    if db is None:
+        from weather_health_app.mongodb import get_db
+        db = get_db()
+    if db is None:
+        logger.error("Cannot roll up weather readings: MongoDB is unavailable")
+        return None
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = start or today - timedelta(days=1)
+    end = end or today + timedelta(days=1)
+    city = f"${city_field()}"
+
+    group = {
+        '_id': {
+            'city': city,
+            'day': {'$dateTrunc': {'date': '$saved_at', 'unit': 'day'}},
+        },
+        'readings': {'$sum': 1},
+        'first_saved_at': {'$min': '$saved_at'},
+        'last_saved_at': {'$max': '$saved_at'},
+    }
+    for field in ROLLUP_FIELDS:
+        group[f"{field}_avg"] = {'$avg': f"${field}"}
+        group[f"{field}_min"] = {'$min': f"${field}"}
+        group[f"{field}_max"] = {'$max': f"${field}"}
+
+    pipeline = [
+        {'$match': {'saved_at': {'$gte': start, '$lt': end}}},
+        {'$group': group},
+        {'$set': {'city': '$_id.city', 'day': '$_id.day', 'rolled_up_at': '$$NOW'}},
+        {'$merge': {
+            'into': rollup_collection_name(),
+            'on': '_id',
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert',
+        }},
+    ]
+    db[readings_collection_name()].aggregate(pipeline)
+    return db[rollup_collection_name()].count_documents({'day': {'$gte': start, '$lt': end}})
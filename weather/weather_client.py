@@ -0,0 +1,254 @@
+"""
+OpenWeather API client with a pooled keep-alive HTTP session
+"""
+import asyncio
+import logging
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .circuit_breaker import get_weather_circuit_breaker
+from .rate_limit import get_rate_limiter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherAPIError(Exception):
+    """Raised when the weather API returns an unusable response"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WeatherAPIUnavailable(WeatherAPIError):
+    """Raised when the API must not be called right now; serve cached data instead"""
+
+    def __init__(self, message, status_code=None, reason='circuit_open'):
+        super().__init__(message, status_code=status_code)
+        self.reason = reason
+
+
+class WeatherAPIRateLimited(WeatherAPIUnavailable):
+    """Raised when the local budget or the provider refuses another request"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message, status_code=status_code, reason='rate_limited')
+
+
+class OpenWeatherClient:
+    """Thin OpenWeather client that reuses connections across requests.
+
+    A single ``requests.Session`` is shared by every caller so TCP and TLS
+    handshakes are paid once per pooled connection instead of once per
+    lookup. ``pool_maxsize`` bounds the connections kept per host and
+    ``pool_block`` makes callers wait for a free connection instead of
+    opening extra, unpooled ones.
+    """
+
+    def __init__(self, api_key, base_url, connect_timeout=3.05, read_timeout=10,
+                 pool_connections=4, pool_maxsize=20, pool_block=False, max_retries=0,
+                 rate_limiter=None, circuit_breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_settings(cls):
+        """Build a client from the WEATHER_API_* settings"""
+        return cls(**_client_options())
+
+    @property
+    def enabled(self):
+        """Whether a real API key is configured"""
+        return bool(self.api_key) and self.api_key != 'demo_key'
+
+    def get(self, endpoint, params=None):
+        """GET an API endpoint and return its decoded JSON body"""
+        _acquire(self.circuit_breaker, self.rate_limiter, endpoint)
+        try:
+            response = self.session.get(
+                f"{self.base_url}/{endpoint.lstrip('/')}",
+                params=_with_credentials(params, self.api_key),
+                timeout=self.timeout
+            )
+        except requests.RequestException:
+            _record_outcome(self.circuit_breaker, None)
+            raise
+        _record_outcome(self.circuit_breaker, response.status_code)
+        _raise_for_status(endpoint, response, self.rate_limiter)
+        return response.json()
+
+    def current_weather(self, **query):
+        """Raw current weather payload for ``q=<city>`` or ``lat``/``lon``"""
+        return self.get('weather', query)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOpenWeatherClient:
+    """Non-blocking counterpart of :class:`OpenWeatherClient` built on httpx.
+
+    An ``httpx.AsyncClient`` is bound to the event loop it was created on,
+    so one instance is kept per running loop (see
+    :func:`get_async_weather_client`).
+    """
+
+    def __init__(self, api_key, base_url, connect_timeout=3.05, read_timeout=10,
+                 pool_connections=4, pool_maxsize=20, pool_block=False, max_retries=0,
+                 rate_limiter=None, circuit_breaker=None):
+        if httpx is None:
+            raise ImproperlyConfigured("httpx is required for async weather fetches")
+
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_maxsize * pool_connections,
+                max_keepalive_connections=pool_maxsize,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=max_retries),
+        )
+
+    @classmethod
+    def from_settings(cls):
+        """Build a client from the WEATHER_API_* settings"""
+        return cls(**_client_options())
+
+    @property
+    def enabled(self):
+        """Whether a real API key is configured"""
+        return bool(self.api_key) and self.api_key != 'demo_key'
+
+    async def get(self, endpoint, params=None):
+        """GET an API endpoint and return its decoded JSON body"""
+        # The rate limiter locks and rewrites its shared state file, so keep it off the event loop
+        await asyncio.to_thread(_acquire, self.circuit_breaker, self.rate_limiter, endpoint)
+        try:
+            response = await self.client.get(
+                f"{self.base_url}/{endpoint.lstrip('/')}",
+                params=_with_credentials(params, self.api_key)
+            )
+        except httpx.HTTPError:
+            _record_outcome(self.circuit_breaker, None)
+            raise
+        _record_outcome(self.circuit_breaker, response.status_code)
+        if response.status_code == 429:
+            await asyncio.to_thread(_raise_for_status, endpoint, response, self.rate_limiter)
+        _raise_for_status(endpoint, response)
+        return response.json()
+
+    async def current_weather(self, **query):
+        """Raw current weather payload for ``q=<city>`` or ``lat``/``lon``"""
+        return await self.get('weather', query)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def _client_options():
+    """Client keyword arguments from the WEATHER_API_* settings"""
+    return dict(
+        api_key=settings.WEATHER_API_KEY,
+        base_url=settings.WEATHER_API_URL,
+        connect_timeout=getattr(settings, 'WEATHER_API_CONNECT_TIMEOUT', 3.05),
+        read_timeout=getattr(settings, 'WEATHER_API_READ_TIMEOUT', 10),
+        pool_connections=getattr(settings, 'WEATHER_API_POOL_CONNECTIONS', 4),
+        pool_maxsize=getattr(settings, 'WEATHER_API_POOL_MAXSIZE', 20),
+        pool_block=getattr(settings, 'WEATHER_API_POOL_BLOCK', False),
+        max_retries=getattr(settings, 'WEATHER_API_MAX_RETRIES', 0),
+        rate_limiter=get_rate_limiter(),
+        circuit_breaker=get_weather_circuit_breaker(),
+    )
+
+
+def _with_credentials(params, api_key):
+    query = dict(params or {})
+    query.setdefault('appid', api_key)
+    query.setdefault('units', 'metric')
+    return query
+
+
+def _acquire(circuit_breaker, rate_limiter, endpoint):
+    if circuit_breaker is not None and not circuit_breaker.allow_request():
+        raise WeatherAPIUnavailable(f"{endpoint}: circuit {circuit_breaker.name} is open")
+    if rate_limiter is not None and not rate_limiter.acquire():
+        if circuit_breaker is not None:
+            circuit_breaker.release()
+        raise WeatherAPIRateLimited(f"{endpoint}: local API budget exhausted")
+
+
+def _record_outcome(circuit_breaker, status_code):
+    """Count timeouts, connection errors and 5xx responses against the circuit"""
+    if circuit_breaker is None:
+        return
+    if status_code is None or status_code >= 500:
+        circuit_breaker.record_failure()
+    else:
+        circuit_breaker.record_success()
+
+
+def _raise_for_status(endpoint, response, rate_limiter=None):
+    status_code = response.status_code
+    if status_code == 429:
+        if rate_limiter is not None:
+            try:
+                retry_after = int(response.headers.get('Retry-After', 60))
+            except ValueError:
+                retry_after = 60
+            rate_limiter.penalize(retry_after)
+        raise WeatherAPIRateLimited(f"{endpoint} returned HTTP 429", status_code=status_code)
+    if status_code != 200:
+        raise WeatherAPIError(f"{endpoint} returned HTTP {status_code}", status_code=status_code)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_weather_client():
+    """Get the shared OpenWeather client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenWeatherClient.from_settings()
+    return _client
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_weather_client():
+    """Get the async OpenWeather client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenWeatherClient.from_settings()
+        _async_clients[loop] = client
+    return client
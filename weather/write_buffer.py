@@ -0,0 +1,279 @@
+"""
+Write-behind buffering of weather readings into MongoDB
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Bounded queue of documents flushed with unordered ``insert_many``.
+
+    A daemon thread flushes whenever ``batch_size`` documents are waiting or
+    ``flush_interval`` seconds have passed since the first one arrived.
+    ``add`` blocks for at most ``put_timeout`` seconds when the queue is full
+    and drops the document after that, so a slow or unreachable server slows
+    requests down only so far. Listeners registered with ``add_listener``
+    are called with the documents after every successful write.
+
+    When a write fails because the server is unavailable (rather than
+    rejecting individual documents) the documents are retried up to
+    ``max_retries`` times with exponential backoff starting at
+    ``retry_backoff`` seconds. At most ``max_size`` documents wait for a
+    retry; anything given up on is counted as ``lost`` in ``stats()``.
+
+    The first ``add`` starts the flusher thread unless ``autostart`` is
+    False, in which case the owner calls ``run_once`` itself.
+    """
+
+    def __init__(self, get_collection, max_size=1000, batch_size=100, flush_interval=1.0,
+                 put_timeout=0.1, max_retries=5, retry_backoff=1.0, max_retry_backoff=60.0,
+                 autostart=True, clock=time.monotonic):
+        self._get_collection = get_collection  # callable() -> collection or None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.autostart = autostart
+        self._clock = clock
+        self._listeners = []
+        self._retries = []  # (due clock time, attempt, documents)
+        self._batch = []    # taken off the queue by run_once, written once full or due
+        self._deadline = None
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'retried': 0,
+            'lost': 0,
+            'flushes': 0,
+            'last_flush_size': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    def add(self, document):
+        """Queue one document; return False if it was dropped because the buffer is full"""
+        if self.autostart:
+            self.start()
+        try:
+            self._queue.put(document, timeout=self.put_timeout)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("Weather write buffer full, dropping reading")
+            return False
+        self._count('queued')
+        return True
+
+    def add_listener(self, listener):
+        """Call ``listener(documents)`` after each batch is written"""
+        self._listeners.append(listener)
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name='weather-write-buffer', daemon=True)
+                    self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stop the flusher and write out everything still queued
+
+        Documents still failing after this last attempt are counted as lost.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+        batch, self._batch, self._deadline = self._batch, [], None
+        if batch:
+            self._write(batch)
+        self.flush()
+        with self._lock:
+            retries, self._retries = self._retries, []
+        lost = sum(len(documents) for _, _, documents in retries)
+        if lost:
+            self._count('lost', lost)
+            logger.error(f"Weather write buffer stopped with {lost} unwritten readings")
+
+    def flush(self):
+        """Write every queued document and retry every failed one now; return how many were written"""
+        written = self._write_retries(force=True)
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['retry_pending'] = sum(len(documents) for _, _, documents in self._retries)
+        stats['pending'] = self._queue.qsize()
+        stats['capacity'] = self._queue.maxsize
+        return stats
+
+    def run_once(self, timeout=None):
+        """One flusher cycle; return how many documents were written
+
+        Waits up to ``timeout`` seconds (default: until the batch or a retry
+        is due) for a queued document, writes the batch once it holds
+        ``batch_size`` documents or ``flush_interval`` has passed since its
+        first one, then retries the failed documents whose backoff has
+        elapsed.
+        """
+        if timeout is None:
+            now = self._clock()
+            timeout = self.flush_interval if self._deadline is None else max(0, self._deadline - now)
+            next_retry = self._next_retry()
+            if next_retry is not None:
+                timeout = min(timeout, max(0, next_retry - now))
+        try:
+            self._batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            if self._deadline is None:
+                self._deadline = self._clock() + self.flush_interval
+        except queue.Empty:
+            pass
+
+        written = 0
+        if self._batch and (len(self._batch) >= self.batch_size or self._clock() >= self._deadline):
+            batch, self._batch, self._deadline = self._batch, [], None
+            written += self._write(batch)
+        return written + self._write_retries()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+
+    def _take(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch, attempt=0):
+        started = time.perf_counter()
+        retry = []
+        with self._write_lock:
+            try:
+                collection = self._get_collection()
+                if collection is None:
+                    raise RuntimeError('MongoDB is unavailable')
+                collection.insert_many(batch, ordered=False)
+                written = batch
+            except BulkWriteError as e:
+                # Documents rejected by the server will be rejected again; a duplicate
+                # _id means an earlier attempt already stored the document
+                rejected = {
+                    error['index'] for error in e.details.get('writeErrors', []) if error.get('code') != 11000
+                }
+                written = [document for index, document in enumerate(batch) if index not in rejected]
+                if rejected:
+                    logger.error(f"Weather write buffer flush partially failed: {len(rejected)} readings rejected")
+            except Exception as e:
+                written = []
+                retry = batch
+                logger.error(f"Weather write buffer flush failed: {e}")
+
+        with self._lock:
+            self._stats['written'] += len(written)
+            self._stats['failed'] += len(batch) - len(written)
+            self._stats['lost'] += len(batch) - len(written) - len(retry)
+            self._stats['flushes'] += 1
+            self._stats['last_flush_size'] = len(batch)
+            self._stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        if retry:
+            self._schedule_retry(retry, attempt)
+        if written:
+            for listener in self._listeners:
+                try:
+                    listener(written)
+                except Exception as e:
+                    logger.error(f"Weather write buffer listener failed: {e}")
+        return len(written)
+
+    def _schedule_retry(self, documents, attempt):
+        if attempt >= self.max_retries:
+            self._count('lost', len(documents))
+            logger.error(f"Weather write buffer gave up on {len(documents)} readings after {attempt + 1} attempts")
+            return
+        delay = min(self.retry_backoff * 2 ** attempt, self.max_retry_backoff)
+        with self._lock:
+            self._retries.append((self._clock() + delay, attempt + 1, documents))
+            # Keep the retry backlog within the queue's capacity, dropping the oldest readings first
+            overflow = sum(len(pending) for _, _, pending in self._retries) - self._queue.maxsize
+            lost = 0
+            while overflow > 0 and self._retries:
+                _, _, oldest = self._retries.pop(0)
+                overflow -= len(oldest)
+                lost += len(oldest)
+            self._stats['lost'] += lost
+        if lost:
+            logger.error(f"Weather write buffer retry backlog full, dropped {lost} readings")
+
+    def _next_retry(self):
+        with self._lock:
+            return min((due for due, _, _ in self._retries), default=None)
+
+    def _write_retries(self, force=False):
+        """Write the failed documents whose backoff has elapsed (all of them with ``force``)"""
+        now = self._clock()
+        with self._lock:
+            due = [entry for entry in self._retries if force or entry[0] <= now]
+            self._retries = [entry for entry in self._retries if not (force or entry[0] <= now)]
+            self._stats['retried'] += sum(len(documents) for _, _, documents in due)
+        return sum(self._write(documents, attempt) for _, attempt, documents in due)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer():
+    """Get the write-behind buffer for the weather readings collection, or None if disabled"""
+    global _buffer
+    from django.conf import settings
+    if not getattr(settings, 'WEATHER_WRITE_BUFFER_ENABLED', True):
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                from weather_health_app.mongodb import get_collection
+                from .timeseries import readings_collection_name
+                _buffer = WriteBehindBuffer(
+                    lambda: get_collection(readings_collection_name()),
+                    max_size=getattr(settings, 'WEATHER_WRITE_BUFFER_MAX_SIZE', 1000),
+                    batch_size=getattr(settings, 'WEATHER_WRITE_BUFFER_BATCH_SIZE', 100),
+                    flush_interval=getattr(settings, 'WEATHER_WRITE_BUFFER_FLUSH_INTERVAL', 1.0),
+                    put_timeout=getattr(settings, 'WEATHER_WRITE_BUFFER_PUT_TIMEOUT', 0.1),
+                    max_retries=getattr(settings, 'WEATHER_WRITE_BUFFER_MAX_RETRIES', 5),
+                    retry_backoff=getattr(settings, 'WEATHER_WRITE_BUFFER_RETRY_BACKOFF', 1.0),
+                )
+                atexit.register(_buffer.stop)
+    return _buffer
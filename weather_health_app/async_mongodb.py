@@ -0,0 +1,56 @@
+"""
+Async MongoDB connection (Motor) for ASGI views and websocket consumers
+"""
+import asyncio
+import logging
+import weakref
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .mongodb import mongodb
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+except ImportError:
+    AsyncIOMotorClient = AsyncIOMotorCollection = None
+
+logger = logging.getLogger(__name__)
+
+# Motor clients are bound to the event loop they are first used on
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Get the Motor client for the running event loop"""
+    if AsyncIOMotorClient is None:
+        raise ImproperlyConfigured("motor is required for async MongoDB access")
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Same pool, timeout and read preference settings as the sync client, with its own pool metrics
+        options = mongodb.client_options(f"motor-{id(loop):x}")
+        client = AsyncIOMotorClient(settings.MONGODB_URI, io_loop=loop, **options)
+        _clients[loop] = client
+        logger.info("Async MongoDB client created")
+        # get_async_collection relies on the health flag, which the sync client's probe maintains
+        mongodb.ensure_health_probe()
+    return client
+
+
+def get_async_db():
+    """Get the async MongoDB database for the running event loop"""
+    return get_async_client()[settings.MONGODB_DB_NAME]
+
+
+def get_async_collection(collection_name):
+    """Get an async MongoDB collection, or None while the health probe reports MongoDB down"""
+    db = get_async_db()
+    if mongodb.is_healthy is False:
+        return None
+    return db.get_collection(collection_name, **mongodb.collection_options(collection_name))
+
+
+def is_async_collection(collection):
+    """True for Motor collections, False for pymongo/mongomock ones"""
+    return AsyncIOMotorCollection is not None and isinstance(collection, AsyncIOMotorCollection)
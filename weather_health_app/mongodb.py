@@ -2,54 +2,305 @@
 MongoDB connection and utility functions
 """
 import pymongo
+from pymongo import monitoring
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
 from django.conf import settings
 import logging
+import threading
+import weakref
 
 logger = logging.getLogger(__name__)
 
+LOCAL_MONGODB_URI = 'mongodb://localhost:27017/'
+
+READ_PREFERENCES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters of one client, used to size pools against worker counts"""
+
+    def __init__(self, max_pool_size=100):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._stats = {
+            'pools': 0,
+            'connections_open': 0,
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checked_out': 0,
+            'max_checked_out': 0,
+            'checkouts': 0,
+            'checkout_failures': 0,
+            'wait_queue_timeouts': 0,
+            'pool_clears': 0,
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        max_pool_size = self.max_pool_size
+        stats['max_pool_size'] = max_pool_size
+        stats['utilization'] = round(stats['checked_out'] / max_pool_size, 3) if max_pool_size else None
+        return stats
+
+    def _add(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def pool_created(self, event):
+        self._add('pools')
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add('pool_clears')
+
+    def pool_closed(self, event):
+        self._add('pools', -1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._stats['connections_created'] += 1
+            self._stats['connections_open'] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._stats['connections_closed'] += 1
+            self._stats['connections_open'] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._stats['checkout_failures'] += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self._stats['wait_queue_timeouts'] += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['checked_out'] += 1
+            self._stats['max_checked_out'] = max(self._stats['max_checked_out'], self._stats['checked_out'])
+
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+
+# Client name -> PoolMetrics; an entry goes away with the client that holds its listener
+_pool_metrics = weakref.WeakValueDictionary()
+_pool_metrics_lock = threading.Lock()
+
+
+def pool_metrics_for(name, max_pool_size):
+    """Register and return a new PoolMetrics listener for the client ``name``"""
+    metrics = PoolMetrics(max_pool_size)
+    with _pool_metrics_lock:
+        _pool_metrics[name] = metrics
+    return metrics
+
+
+def pool_stats():
+    """Pool counters and utilization for every live client, keyed by client name"""
+    with _pool_metrics_lock:
+        metrics = dict(_pool_metrics)
+    return {name: metrics[name].stats() for name in sorted(metrics)}
+
+
 class MongoDBConnection:
+    """Lazily connected MongoDB client shared by the whole process.
+
+    Nothing touches the network at import time: the client is built on first
+    use (pymongo connects in the background), and a daemon thread pings the
+    server every MONGODB_HEALTH_CHECK_INTERVAL seconds. While the last ping
+    failed, ``get_collection`` returns ``None`` so callers fall back
+    immediately instead of waiting for server selection to time out.
+    """
     _instance = None
     _client = None
     _db = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(MongoDBConnection, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._healthy = None
+            cls._instance._probe = None
+            cls._instance._probe_stop = threading.Event()
         return cls._instance
-    
+
     def __init__(self):
-        if self._client is None:
+        pass
+
+    def client_options(self, name='sync'):
+        """MongoClient options from settings, with pool metrics registered under ``name``"""
+        max_pool_size = getattr(settings, 'MONGODB_MAX_POOL_SIZE', 100)
+        options = {
+            'connectTimeoutMS': getattr(settings, 'MONGODB_CONNECT_TIMEOUT_MS', 2000),
+            'serverSelectionTimeoutMS': getattr(settings, 'MONGODB_SERVER_SELECTION_TIMEOUT_MS', 2000),
+            'maxPoolSize': max_pool_size,
+            'minPoolSize': getattr(settings, 'MONGODB_MIN_POOL_SIZE', 0),
+            'waitQueueTimeoutMS': getattr(settings, 'MONGODB_WAIT_QUEUE_TIMEOUT_MS', None),
+            'maxIdleTimeMS': getattr(settings, 'MONGODB_MAX_IDLE_TIME_MS', None),
+            'readPreference': getattr(settings, 'MONGODB_READ_PREFERENCE', 'primary'),
+            'event_listeners': [pool_metrics_for(name, max_pool_size)],
+        }
+        compressors = getattr(settings, 'MONGODB_COMPRESSORS', '')
+        if compressors:
+            options['compressors'] = compressors
+        return options
+
+    def collection_options(self, collection_name):
+        """read_preference / read_concern / write_concern for one collection from settings"""
+        config = getattr(settings, 'MONGODB_COLLECTION_OPTIONS', {}).get(collection_name, {})
+        options = {}
+        if 'read_preference' in config:
+            options['read_preference'] = READ_PREFERENCES[config['read_preference']]()
+        if 'read_concern' in config:
+            options['read_concern'] = ReadConcern(config['read_concern'])
+        if 'write_concern' in config:
+            options['write_concern'] = WriteConcern(**config['write_concern'])
+        return options
+
+    def _connect(self):
+        if self._client is not None:
+            return
+        with self._lock:
+            if self._client is not None:
+                return
             try:
-                self._client = pymongo.MongoClient(settings.MONGODB_URI)
+                self._client = pymongo.MongoClient(settings.MONGODB_URI, **self.client_options())
                 self._db = self._client[settings.MONGODB_DB_NAME]
-                # Test connection
-                self._client.admin.command('ping')
-                logger.info("MongoDB connection established successfully")
+                logger.info("MongoDB client created")
             except Exception as e:
                 logger.error(f"MongoDB connection failed: {e}")
                 # Fallback to local MongoDB for demo
                 try:
-                    self._client = pymongo.MongoClient('mongodb://localhost:27017/')
+                    self._client = pymongo.MongoClient(LOCAL_MONGODB_URI, **self.client_options('local'))
                     self._db = self._client[settings.MONGODB_DB_NAME]
                     logger.info("Connected to local MongoDB")
                 except Exception as local_e:
                     logger.error(f"Local MongoDB connection also failed: {local_e}")
                     self._client = None
                     self._db = None
-    
+                    return
+            self._start_health_probe()
+
+    def ensure_health_probe(self):
+        """Build the client and start the health probe without waiting for a server
+
+        Processes that only use Motor call this, so ``is_healthy`` is kept up
+        to date for them too.
+        """
+        self._connect()
+
+    def _start_health_probe(self):
+        interval = getattr(settings, 'MONGODB_HEALTH_CHECK_INTERVAL', 30)
+        if not interval or self._probe is not None:
+            return
+        self._probe = threading.Thread(
+            target=self._run_health_probe, args=(interval, self._probe_stop),
+            name='mongodb-health', daemon=True
+        )
+        self._probe.start()
+
+    def _run_health_probe(self, interval, stop):
+        while not stop.is_set():
+            self.check_health()
+            stop.wait(interval)
+
+    def check_health(self):
+        """Ping the server and record whether it is reachable"""
+        client = self._client
+        if client is None:
+            self._healthy = False
+            return False
+        try:
+            client.admin.command('ping')
+            healthy = True
+        except Exception as e:
+            healthy = False
+            if self._healthy is not False:
+                logger.error(f"MongoDB health check failed: {e}")
+            if self._healthy is None:
+                healthy = self._try_local_fallback()
+
+        if healthy and self._healthy is False:
+            logger.info("MongoDB connection restored")
+        self._healthy = healthy
+        return healthy
+
+    def _try_local_fallback(self):
+        """Switch to a local server if the configured one was never reachable"""
+        if settings.MONGODB_URI == LOCAL_MONGODB_URI:
+            return False
+        local_client = None
+        try:
+            local_client = pymongo.MongoClient(LOCAL_MONGODB_URI, **self.client_options('local'))
+            local_client.admin.command('ping')
+        except Exception as local_e:
+            logger.error(f"Local MongoDB connection also failed: {local_e}")
+            if local_client is not None:
+                local_client.close()
+            return False
+        with self._lock:
+            old_client = self._client
+            self._client = local_client
+            self._db = local_client[settings.MONGODB_DB_NAME]
+        old_client.close()
+        logger.info("Connected to local MongoDB")
+        return True
+
+    @property
+    def is_healthy(self):
+        """True/False after the first health probe, None before it has run"""
+        return self._healthy
+
     @property
     def client(self):
+        self._connect()
         return self._client
-    
+
     @property
     def db(self):
+        self._connect()
         return self._db
-    
+
     def get_collection(self, collection_name):
-        if self._db is not None:
-            return self._db[collection_name]
+        self._connect()
+        db = self._db
+        if db is not None and self._healthy is not False:
+            return db.get_collection(collection_name, **self.collection_options(collection_name))
         return None
 
+    def pool_stats(self):
+        """Connection pool utilization of every live client (sync, local fallback, per-loop Motor)"""
+        return pool_stats()
+
+    def close(self):
+        self._probe_stop.set()
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+            self._db = None
+            self._probe = None
+            self._healthy = None
+        self._probe_stop = threading.Event()
+
+
 # Global MongoDB instance
 mongodb = MongoDBConnection()
 
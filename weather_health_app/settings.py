@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -147,6 +148,30 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # MongoDB Configuration
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'weather_health_db')
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', '2000'))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '2000'))
+MONGODB_HEALTH_CHECK_INTERVAL = int(os.getenv('MONGODB_HEALTH_CHECK_INTERVAL', '30'))  # seconds, 0 disables the probe
+
+# weather_data indexes
+WEATHER_ENSURE_INDEXES_ON_STARTUP = os.getenv('WEATHER_ENSURE_INDEXES_ON_STARTUP', 'False').lower() == 'true'  # or run manage.py weather_indexes
+
+# MongoDB connection pool (per process: size against the number of worker processes)
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '100'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '0'))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '0')) or None
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '0')) or None
+MONGODB_COMPRESSORS = os.getenv('MONGODB_COMPRESSORS', '')  # e.g. 'zstd,snappy,zlib'
+MONGODB_READ_PREFERENCE = os.getenv('MONGODB_READ_PREFERENCE', 'primary')
+
+# Per-collection read preference, read concern and write concern
+MONGODB_COLLECTION_OPTIONS = {
+    'weather_data': {
+        # Secondaries can lag behind the reading cache's invalidate-on-write; only relax if stale reads are acceptable
+        'read_preference': os.getenv('MONGODB_WEATHER_READ_PREFERENCE', 'primary'),
+        'read_concern': 'local',
+        'write_concern': {'w': 1},
+    },
+}
 
 # Weather API Configuration
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY', '5c0912b69ecafdd52573f50151a0a0da')
@@ -194,3 +219,66 @@ AUTH_USER_MODEL = 'authentication.CustomUser'
 # CELERY_TASK_SERIALIZER = 'json'
 # CELERY_RESULT_SERIALIZER = 'json'
 # CELERY_TIMEZONE = 'UTC'
+
+# Weather Cache Configuration
+WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', '600'))  # 10 minutes
+WEATHER_CACHE_STALE_TTL = int(os.getenv('WEATHER_CACHE_STALE_TTL', '1800'))  # served stale while refreshing
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', '1000'))
+
+# Weather API HTTP Client Configuration
+WEATHER_API_CONNECT_TIMEOUT = float(os.getenv('WEATHER_API_CONNECT_TIMEOUT', '3.05'))
+WEATHER_API_READ_TIMEOUT = float(os.getenv('WEATHER_API_READ_TIMEOUT', '10'))
+WEATHER_API_POOL_CONNECTIONS = int(os.getenv('WEATHER_API_POOL_CONNECTIONS', '4'))  # hosts kept in the pool
+WEATHER_API_POOL_MAXSIZE = int(os.getenv('WEATHER_API_POOL_MAXSIZE', '20'))  # connections per host
+WEATHER_API_POOL_BLOCK = os.getenv('WEATHER_API_POOL_BLOCK', 'False').lower() == 'true'
+WEATHER_API_MAX_RETRIES = int(os.getenv('WEATHER_API_MAX_RETRIES', '0'))
+
+# Multi-city Weather Batch Configuration
+WEATHER_BATCH_MAX_WORKERS = int(os.getenv('WEATHER_BATCH_MAX_WORKERS', '8'))  # concurrent upstream fetches
+WEATHER_BATCH_TIMEOUT = float(os.getenv('WEATHER_BATCH_TIMEOUT', '5'))  # seconds before falling back to demo data
+
+# Weather Prefetch Configuration
+WEATHER_PREFETCH_IN_PROCESS = os.getenv('WEATHER_PREFETCH_IN_PROCESS', 'False').lower() == 'true'
+WEATHER_PREFETCH_TOP_K = int(os.getenv('WEATHER_PREFETCH_TOP_K', '20'))  # most requested cities kept warm
+WEATHER_PREFETCH_LEAD_TIME = int(os.getenv('WEATHER_PREFETCH_LEAD_TIME', '60'))  # seconds before expiry
+WEATHER_PREFETCH_INTERVAL = int(os.getenv('WEATHER_PREFETCH_INTERVAL', '15'))
+# Serve current weather saved by other processes (prefetch_weather --save) on a cache miss.
+# Costs a MongoDB lookup per miss, so only enable it alongside prefetch_weather --save.
+WEATHER_USE_SAVED_READINGS = os.getenv('WEATHER_USE_SAVED_READINGS', 'False').lower() == 'true'
+
+# Weather API Rate Limiting (shared by all workers on this host)
+WEATHER_API_RATE_LIMIT_PER_MINUTE = int(os.getenv('WEATHER_API_RATE_LIMIT_PER_MINUTE', '60'))
+WEATHER_API_RATE_LIMIT_BURST = int(os.getenv('WEATHER_API_RATE_LIMIT_BURST', '10'))
+WEATHER_API_DAILY_BUDGET = int(os.getenv('WEATHER_API_DAILY_BUDGET', '0'))  # 0 = no daily cap
+WEATHER_API_RATE_LIMIT_FILE = os.getenv('WEATHER_API_RATE_LIMIT_FILE', os.path.join(tempfile.gettempdir(), 'weather_api_rate_limit.json'))
+
+# Weather API Circuit Breaker
+WEATHER_API_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('WEATHER_API_CIRCUIT_FAILURE_THRESHOLD', '5'))  # consecutive failures
+WEATHER_API_CIRCUIT_RECOVERY_TIMEOUT = int(os.getenv('WEATHER_API_CIRCUIT_RECOVERY_TIMEOUT', '30'))  # seconds open
+WEATHER_API_CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv('WEATHER_API_CIRCUIT_HALF_OPEN_MAX_CALLS', '1'))
+
+# Weather Write-behind Buffer (batched inserts into weather_data)
+WEATHER_WRITE_BUFFER_ENABLED = os.getenv('WEATHER_WRITE_BUFFER_ENABLED', 'True').lower() == 'true'
+WEATHER_WRITE_BUFFER_MAX_SIZE = int(os.getenv('WEATHER_WRITE_BUFFER_MAX_SIZE', '1000'))  # queued readings before backpressure
+WEATHER_WRITE_BUFFER_BATCH_SIZE = int(os.getenv('WEATHER_WRITE_BUFFER_BATCH_SIZE', '100'))
+WEATHER_WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv('WEATHER_WRITE_BUFFER_FLUSH_INTERVAL', '1.0'))  # seconds
+WEATHER_WRITE_BUFFER_PUT_TIMEOUT = float(os.getenv('WEATHER_WRITE_BUFFER_PUT_TIMEOUT', '0.1'))  # seconds to wait when full
+WEATHER_WRITE_BUFFER_MAX_RETRIES = int(os.getenv('WEATHER_WRITE_BUFFER_MAX_RETRIES', '5'))  # per failed flush, then readings count as lost
+WEATHER_WRITE_BUFFER_RETRY_BACKOFF = float(os.getenv('WEATHER_WRITE_BUFFER_RETRY_BACKOFF', '1.0'))  # seconds, doubled per attempt
+
+# Stored Weather Reading Cache (get_weather_from_mongodb)
+WEATHER_READINGS_CACHE_TTL = int(os.getenv('WEATHER_READINGS_CACHE_TTL', '60'))
+WEATHER_READINGS_CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_READINGS_CACHE_MAX_ENTRIES', '500'))
+WEATHER_HISTORY_CACHE_TTL = int(os.getenv('WEATHER_HISTORY_CACHE_TTL', '900'))  # historical windows
+WEATHER_HISTORY_CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_HISTORY_CACHE_MAX_ENTRIES', '200'))
+
+# Recommendation Cache (hour-independent comprehensive recommendations, keyed by weather/role/conditions/devices)
+WEATHER_RECOMMENDATION_CACHE_TTL = int(os.getenv('WEATHER_RECOMMENDATION_CACHE_TTL', '600'))
+WEATHER_RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_RECOMMENDATION_CACHE_MAX_ENTRIES', '2000'))
+
+# Weather Reading Storage ('documents' = plain weather_data collection, 'timeseries' = MongoDB 5.0+ time-series)
+WEATHER_STORAGE_MODE = os.getenv('WEATHER_STORAGE_MODE', 'documents')
+WEATHER_TIMESERIES_COLLECTION = os.getenv('WEATHER_TIMESERIES_COLLECTION', 'weather_readings')
+WEATHER_TIMESERIES_GRANULARITY = os.getenv('WEATHER_TIMESERIES_GRANULARITY', 'minutes')
+WEATHER_TIMESERIES_EXPIRE_AFTER_SECONDS = int(os.getenv('WEATHER_TIMESERIES_EXPIRE_AFTER_SECONDS', str(3 * 365 * 24 * 3600)))  # 0 = keep forever
+WEATHER_ROLLUP_COLLECTION = os.getenv('WEATHER_ROLLUP_COLLECTION', 'weather_daily')